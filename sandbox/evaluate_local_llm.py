@@ -29,9 +29,13 @@ os.environ["LM_STUDIO_ENDPOINT"] = "http://localhost:1234/v1"
 config = Config()
 config.system.llm_mapper_responses_folder = project_root / "data" / "nemotron_responses"
 llm_mapper = LlmMapper(config)
+# Optionally reuse mappings of near-duplicate terms instead of prompting the LLM again. Note that this requires the
+# embedding model to be available, and changes what is evaluated:
+# from ariadne.llm_mapping.semantic_response_cache import SemanticResponseCache
+# llm_mapper = SemanticResponseCache(llm_mapper, config)
 
 # Limit to a set of hard cases, and use the LLM to map:
-hard_cases = [
+hard_cases = {
     "9724",
     "1423175",
     "1569915",
@@ -52,6 +56,13 @@ hard_cases = [
     "42618665",
     "4160345",
     "1413053",
+}
+# Only terms without a verbatim match need to go to the LLM:
+verbatim_match_file = project_root / "data" / "notebook_results" / "exact_matching_verbatim_maps.csv"
+verbatim_matches = pd.read_csv(verbatim_match_file)
+verbatim_matches = verbatim_matches[verbatim_matches["mapped_concept_id"] != -1]
+vector_search_results_context = vector_search_results_context[
+    ~vector_search_results_context["source_concept_id"].isin(verbatim_matches["source_concept_id"])
 ]
 mapped_terms = llm_mapper.map_terms(
     vector_search_results_context,
@@ -59,9 +70,7 @@ mapped_terms = llm_mapper.map_terms(
 )
 
 # Combine verbatim matches and LLM matches
-verbatim_match_file = project_root / "data" / "notebook_results" / "exact_matching_verbatim_maps.csv"
-verbatim_matches = pd.read_csv(verbatim_match_file)
-final_mapped_terms = verbatim_matches[verbatim_matches["mapped_concept_id"] != -1][
+final_mapped_terms = verbatim_matches[
     ["source_concept_id", "source_term", "cleaned_term", "mapped_concept_id", "mapped_concept_name"]
 ].copy()
 final_mapped_terms["map_method"] = "verbatim"
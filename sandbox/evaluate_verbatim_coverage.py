@@ -3,26 +3,19 @@ from ariadne.verbatim_mapping.vocab_verbatim_term_mapper import VocabVerbatimTer
 
 mapper = VocabVerbatimTermMapper()
 
-terms = pd.read_csv("E:/temp/mapping_quality/ICD10CMterms.csv")
+input_file = "E:/temp/mapping_quality/ICD10CMterms.csv"
+output_file = "E:/temp/mapping_quality/ICD10CMterms_mapped.csv"
 mapped_count = 0
 unmapped_count = 0
-count = 0
-concept_ids = []
-concept_names = []
-for term in terms["concept_name"].tolist():
-    concepts = mapper.map_term(term)
-    if concepts:
-        mapped_count += 1
-        concept_ids.append(";".join(str(c[0]) for c in concepts))
-        concept_names.append(";".join(c[1] for c in concepts))
-    else:
-        unmapped_count += 1
-        concept_ids.append("")
-        concept_names.append("")
-    count += 1
-    if count % 1000 == 0:
-        print(f"Processed {count} terms...")
-terms["mapped_concept_ids"] = concept_ids
-terms["mapped_concept_names"] = concept_names
-terms.to_csv("E:/temp/mapping_quality/ICD10CMterms_mapped.csv", index=False)
+# Process the terms in chunks, appending each mapped chunk to the output file:
+reader = pd.read_csv(input_file, chunksize=20000, dtype={"concept_name": "string"})
+for chunk_index, terms in enumerate(reader):
+    mapped_concepts = mapper.map_term_list(terms["concept_name"].tolist())
+    chunk_mapped_count = sum(1 for concepts in mapped_concepts if concepts)
+    mapped_count += chunk_mapped_count
+    unmapped_count += len(mapped_concepts) - chunk_mapped_count
+    terms["mapped_concept_ids"] = [";".join(str(c[0]) for c in concepts) for concepts in mapped_concepts]
+    terms["mapped_concept_names"] = [";".join(c[1] for c in concepts) for concepts in mapped_concepts]
+    terms.to_csv(output_file, mode="w" if chunk_index == 0 else "a", header=chunk_index == 0, index=False)
+    print(f"Processed {mapped_count + unmapped_count} terms...")
 print(f"Mapped terms: {mapped_count}, Unmapped terms: {unmapped_count}")
@@ -13,9 +13,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import math
+import functools
 from pathlib import Path
-from typing import Dict, Any
 
 import numpy as np
 import pandas as pd
@@ -34,26 +33,21 @@ PREDICATE_B = "predicate_b"
 BROAD_MATCH = "broadMatch"
 
 
-def _load_gold_standard(filename: str | Path) -> Dict[int, Dict[str, Any]]:
-    df = pd.read_csv(filename)
-    gold_standard = {}
-    for index, row in df.iterrows():
-        details: Dict[str, Any] = {SOURCE_TERM: str(row[SOURCE_TERM])}
-        if row[PREDICATE] == BROAD_MATCH:
-            details[TARGET_CONCEPT_ID] = None
-            details[TARGET_CONCEPT_NAME] = None
-        else:
-            details[TARGET_CONCEPT_ID] = int(row[TARGET_CONCEPT_ID])
-            details[TARGET_CONCEPT_NAME] = str(row[TARGET_CONCEPT_NAME])
-        if row[PREDICATE_B] == BROAD_MATCH or pd.isna(row[TARGET_CONCEPT_ID_B]):
-            details[TARGET_CONCEPT_ID_B] = None
-            details[TARGET_CONCEPT_NAME_B] = None
-        else:
-            details[TARGET_CONCEPT_ID_B] = int(row[TARGET_CONCEPT_ID_B])
-            details[TARGET_CONCEPT_NAME_B] = str(row[TARGET_CONCEPT_NAME_B])
-        gold_standard[int(row[SOURCE_CONCEPT_ID])] = details
-
-    return gold_standard
+@functools.lru_cache(maxsize=8)
+def _load_gold_standard(filename: str) -> pd.DataFrame:
+    """
+    Loads the gold standard, indexed by source concept ID. Only the first entry per source concept ID is kept. Results
+    are cached per file, so the returned DataFrame is shared between calls and must not be modified.
+
+    Args:
+        filename: Path to the CSV file containing the gold standard mappings.
+
+    Returns:
+        A Pandas DataFrame with the gold standard mappings.
+    """
+    # Predicates have only a few distinct values, so comparisons on categorical codes are much faster than on strings:
+    gold_standard = pd.read_csv(filename, dtype={PREDICATE: "category", PREDICATE_B: "category"})
+    return gold_standard.drop_duplicates(subset=SOURCE_CONCEPT_ID).set_index(SOURCE_CONCEPT_ID)
 
 
 def evaluate_concept_search(
@@ -65,6 +59,7 @@ def evaluate_concept_search(
     matched_concept_id_column: str = "matched_concept_id",
     matched_concept_name_column: str = "matched_concept_name",
     match_rank_column: str = "match_rank",
+    write_details: bool = True,
 ) -> None:
     """
     Evaluate the concept search results against the gold standard.
@@ -78,81 +73,57 @@ def evaluate_concept_search(
         matched_concept_id_column: Name of the column in the search results with matched concept IDs.
         matched_concept_name_column: Name of the column in the search results with matched concept names.
         match_rank_column: Name of the column in the search results with the rank of the matched concepts.
+        write_details: If True, the search results per source term are written after the summary statistics.
 
     Returns:
         None. Execution results are written to the specified output file.
     """
-    detail_strings = []
-    # gold_standard = _load_gold_standard(resolve_path(gold_standard_file))
-    gold_standard = pd.read_csv(resolve_path(gold_standard_file))
-    evaluated_gs_count = 0
-    mean_average_precision = 0
-    recall_1 = 0
-    recall_3 = 0
-    recall_10 = 0
-    recall_25 = 0
-
-    grouped = search_results.groupby(source_id_column)
-    for source_id, group in grouped:
-        gs_entry = gold_standard[gold_standard[SOURCE_CONCEPT_ID] == source_id]
-        if gs_entry.empty:
-            continue
-        gs_entry = gs_entry.iloc[0]
-        gs_source_term = gs_entry[SOURCE_TERM]
-        gs_concept_id = gs_entry[TARGET_CONCEPT_ID]
-        gs_concept_id_b = gs_entry[TARGET_CONCEPT_ID_B]
-        gold_predicate = gs_entry[PREDICATE]
-        gold_predicate_b = gs_entry[PREDICATE_B]
-        if gold_predicate == BROAD_MATCH:
-            gs_concept_id = None
-        if gold_predicate_b == BROAD_MATCH:
-            gs_concept_id_b = None
-        if gs_concept_id is None and (gs_concept_id_b is None or math.isnan(gs_concept_id_b)):
-            continue
-        evaluated_gs_count = evaluated_gs_count + 1
-        gs_rank = group.loc[group[matched_concept_id_column] == gs_concept_id, match_rank_column]
-        if gs_concept_id_b is not None:
-            gs_rank_b = group.loc[group[matched_concept_id_column] == gs_concept_id_b, match_rank_column]
-            if not gs_rank_b.empty:
-                if gs_rank.empty or gs_rank_b.iloc[0] < gs_rank.iloc[0]:
-                    gs_rank = gs_rank_b
-                    gs_concept_id = gs_concept_id_b
-        detail_strings.append(f"Source term: {gs_source_term} ({source_id})")
-        detail_strings.append(f"Searched term: {group[term_column].iloc[0]}")
-        if gs_rank.empty:
-            detail_strings.append("Gold standard concept not found")
-            gs_concept_name = gs_entry[TARGET_CONCEPT_NAME]
-            detail_strings.append(f"Correct target was: {gs_concept_name} ({gs_concept_id})")
-        else:
-            gs_rank = gs_rank.iloc[0]
-            detail_strings.append(f"Gold standard concept rank: {gs_rank}")
-            mean_average_precision = mean_average_precision + 1 / gs_rank
-            if gs_rank <= 1:
-                recall_1 = recall_1 + 1
-            if gs_rank <= 3:
-                recall_3 = recall_3 + 1
-            if gs_rank <= 10:
-                recall_10 = recall_10 + 1
-            if gs_rank <= 25:
-                recall_25 = recall_25 + 1
-
-        detail_strings.append("")
-
-        table = group[[match_rank_column, matched_concept_id_column, matched_concept_name_column]].copy()
-        correct = np.where(table[matched_concept_id_column] == gs_concept_id, "Yes", "")
-        if gs_concept_id_b:
-            correct_b = np.where(table[matched_concept_id_column] == gs_concept_id_b, "Yes", "")
-            correct = np.where(correct == "Yes", "Yes", correct_b)
-
-        table.insert(1, "Correct", correct)
-        detail_strings.append(table.to_string(index=False))
-        detail_strings.append("")
-
-    mean_average_precision = mean_average_precision / evaluated_gs_count
-    recall_1 = recall_1 / evaluated_gs_count
-    recall_3 = recall_3 / evaluated_gs_count
-    recall_10 = recall_10 / evaluated_gs_count
-    recall_25 = recall_25 / evaluated_gs_count
+    gold_standard = _load_gold_standard(resolve_path(gold_standard_file))
+    # Broad matches are not considered correct targets:
+    gs_concept_ids = gold_standard[TARGET_CONCEPT_ID].where(gold_standard[PREDICATE] != BROAD_MATCH)
+    gs_concept_ids_b = gold_standard[TARGET_CONCEPT_ID_B].where(gold_standard[PREDICATE_B] != BROAD_MATCH)
+    has_target = gs_concept_ids.notna() | gs_concept_ids_b.notna()
+
+    search_results = search_results[search_results[source_id_column].isin(gold_standard.index[has_target])]
+    source_ids = search_results[source_id_column]
+    matched_concept_ids = search_results[matched_concept_id_column]
+    is_correct = (matched_concept_ids == source_ids.map(gs_concept_ids)) | (
+        matched_concept_ids == source_ids.map(gs_concept_ids_b)
+    )
+    gs_ranks = search_results[is_correct].groupby(source_id_column)[match_rank_column].min()
+
+    ranks = gs_ranks.to_numpy()
+    evaluated_gs_count = source_ids.nunique()
+    mean_average_precision = np.sum(1 / ranks) / evaluated_gs_count
+    recall_1, recall_3, recall_10, recall_25 = (
+        np.count_nonzero(ranks <= k) / evaluated_gs_count for k in (1, 3, 10, 25)
+    )
+
+    if write_details:
+        detail_strings = []
+        is_correct = is_correct.to_numpy()
+        grouped = search_results.groupby(source_id_column)
+        for source_id, group in grouped:
+            gs_source_term = gold_standard.at[source_id, SOURCE_TERM]
+            detail_strings.append(f"Source term: {gs_source_term} ({source_id})")
+            detail_strings.append(f"Searched term: {group[term_column].iat[0]}")
+            if source_id in gs_ranks.index:
+                detail_strings.append(f"Gold standard concept rank: {gs_ranks[source_id]}")
+            else:
+                detail_strings.append("Gold standard concept not found")
+                if gold_standard.at[source_id, PREDICATE] == BROAD_MATCH:
+                    gs_concept_id = None
+                else:
+                    gs_concept_id = gold_standard.at[source_id, TARGET_CONCEPT_ID]
+                gs_concept_name = gold_standard.at[source_id, TARGET_CONCEPT_NAME]
+                detail_strings.append(f"Correct target was: {gs_concept_name} ({gs_concept_id})")
+            detail_strings.append("")
+
+            table = group[[match_rank_column, matched_concept_id_column, matched_concept_name_column]]
+            correct = np.where(is_correct[grouped.indices[source_id]], "Yes", "")
+            table.insert(1, "Correct", correct)
+            detail_strings.append(table.to_string(index=False))
+            detail_strings.append("")
 
     summary_strings = [
         f"Evaluated gold standard concepts: {evaluated_gs_count}",
@@ -165,8 +136,10 @@ def evaluate_concept_search(
 
     with open(output_file, "w", encoding="UTF-8") as f:
         f.write("\n".join(summary_strings))
-        f.write("\n\n")
-        f.write("\n".join(detail_strings))
         f.write("\n")
+        if write_details:
+            f.write("\n")
+            f.write("\n".join(detail_strings))
+            f.write("\n")
 
     print(f"Evaluation complete. Results written to {output_file}")
@@ -1,5 +1,6 @@
 from typing import Optional, List
 
+import numpy as np
 import pandas as pd
 
 from ariadne.evaluation.concept_search_evaluator import _load_gold_standard
@@ -43,68 +44,68 @@ def evaluate(
         source_ids: Optional list of source concept IDs to evaluate. If None, evaluate all.
 
     Returns:
-        A Pandas DataFrame with the evaluation results.
+        A Pandas DataFrame with the evaluation results. Source concept IDs are returned as strings.
     """
-    gold_standard = pd.read_csv(resolve_path(gold_standard_file),
-                                dtype={SOURCE_CONCEPT_ID: str})
+    gold_standard = _load_gold_standard(resolve_path(gold_standard_file))
 
     if mapped_method_column:
         output_mapped_method_column = mapped_method_column
     else:
         output_mapped_method_column = "map_method"
 
-    selection_results.reset_index(drop=True, inplace=True)
-    evaluation_results = []
-    for index, row in selection_results.iterrows():
-        source_id = str(row[source_id_column])
-        if source_ids is not None and source_id not in source_ids:
-            continue
+    # Source IDs may be a mix of integers and strings, so cast them all to integers once:
+    source_id = selection_results[source_id_column].astype("int64")
+    if source_ids is not None:
+        in_source_ids = np.isin(source_id.to_numpy(), [int(x) for x in source_ids])
+        selection_results = selection_results[in_source_ids]
+        source_id = source_id[in_source_ids]
 
-        gold_entry = gold_standard[gold_standard[SOURCE_CONCEPT_ID] == source_id]
-        if gold_entry.empty:
-            continue
-        gold_entry = gold_entry.iloc[0]
-        gold_target_concept_id = gold_entry[TARGET_CONCEPT_ID]
-        gold_target_concept_id_b = gold_entry[TARGET_CONCEPT_ID_B]
-        gold_predicate = gold_entry[PREDICATE]
-        gold_predicate_b = gold_entry[PREDICATE_B]
+    if mapped_method_column and mapped_method_column in selection_results.columns:
+        map_method = selection_results[mapped_method_column]
+    else:
+        map_method = "unknown"
+    selected = pd.DataFrame({SOURCE_CONCEPT_ID: source_id, output_mapped_method_column: map_method})
+    if term_column != SOURCE_TERM:
+        selected[term_column] = selection_results[term_column]
+    selected[mapped_concept_id_column] = selection_results[mapped_concept_id_column].astype(int)
+    selected[mapped_concept_name_column] = selection_results[mapped_concept_name_column]
+    include_rationale = mapped_rationale_column and mapped_rationale_column in selection_results.columns
+    if include_rationale:
+        selected[mapped_rationale_column] = selection_results[mapped_rationale_column]
 
-        mapped_concept_id = int(row[mapped_concept_id_column])
-        if mapped_method_column and mapped_method_column in row:
-            map_method = row[mapped_method_column]
-        else:
-            map_method = "unknown"
-        is_correct = (
-            (mapped_concept_id == gold_target_concept_id and gold_predicate == EXACT_MATCH)
-            or (mapped_concept_id == gold_target_concept_id_b and gold_predicate_b == EXACT_MATCH)
-            or (mapped_concept_id == -1 and gold_predicate == BROAD_MATCH)
-            or (mapped_concept_id == -1 and gold_predicate_b == BROAD_MATCH)
-        )
-        result_row = {
-            SOURCE_CONCEPT_ID: source_id,
-            SOURCE_TERM: gold_entry.get(SOURCE_TERM),
-            output_mapped_method_column: map_method,
-            TARGET_CONCEPT_ID: gold_target_concept_id,
-            TARGET_CONCEPT_NAME: gold_entry.get(TARGET_CONCEPT_NAME),
-            PREDICATE: gold_predicate,
-            TARGET_CONCEPT_ID_B: gold_target_concept_id_b,
-            TARGET_CONCEPT_NAME_B: gold_entry.get(TARGET_CONCEPT_NAME_B),
-            PREDICATE_B: gold_predicate_b,
-        }
-        if term_column != SOURCE_TERM:
-            result_row[term_column] = row[term_column]
-        result_row.update(
-            {
-                mapped_concept_id_column: mapped_concept_id,
-                mapped_concept_name_column: row[mapped_concept_name_column],
-                "is_correct": is_correct,
-            }
+    evaluation_df = selected.join(gold_standard, on=SOURCE_CONCEPT_ID, how="inner")
+
+    mapped_concept_id = evaluation_df[mapped_concept_id_column]
+    evaluation_df["is_correct"] = (
+        ((mapped_concept_id == evaluation_df[TARGET_CONCEPT_ID]) & (evaluation_df[PREDICATE] == EXACT_MATCH))
+        | ((mapped_concept_id == evaluation_df[TARGET_CONCEPT_ID_B]) & (evaluation_df[PREDICATE_B] == EXACT_MATCH))
+        | (
+            (mapped_concept_id == -1)
+            & ((evaluation_df[PREDICATE] == BROAD_MATCH) | (evaluation_df[PREDICATE_B] == BROAD_MATCH))
         )
-        if mapped_rationale_column and mapped_rationale_column in row:
-            result_row[mapped_rationale_column] = row[mapped_rationale_column]
+    )
 
-        evaluation_results.append(result_row)
-    evaluation_df = pd.DataFrame(evaluation_results)
+    output_columns = [
+        SOURCE_CONCEPT_ID,
+        SOURCE_TERM,
+        output_mapped_method_column,
+        TARGET_CONCEPT_ID,
+        TARGET_CONCEPT_NAME,
+        PREDICATE,
+        TARGET_CONCEPT_ID_B,
+        TARGET_CONCEPT_NAME_B,
+        PREDICATE_B,
+    ]
+    if term_column != SOURCE_TERM:
+        output_columns.append(term_column)
+    output_columns.extend([mapped_concept_id_column, mapped_concept_name_column, "is_correct"])
+    if include_rationale:
+        output_columns.append(mapped_rationale_column)
+    evaluation_df = evaluation_df[output_columns].reset_index(drop=True)
+    # Return source concept IDs as strings (callers filter on string IDs) and predicates as strings, not categories:
+    evaluation_df[SOURCE_CONCEPT_ID] = evaluation_df[SOURCE_CONCEPT_ID].astype(str)
+    evaluation_df[PREDICATE] = evaluation_df[PREDICATE].astype(object).infer_objects()
+    evaluation_df[PREDICATE_B] = evaluation_df[PREDICATE_B].astype(object).infer_objects()
 
     # Add overall accuracy as a column:
     accuracy = evaluation_df["is_correct"].mean()
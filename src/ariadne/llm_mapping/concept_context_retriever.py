@@ -1,4 +1,5 @@
-from typing import List
+import functools
+from typing import List, Dict, Optional, Tuple
 
 import pandas as pd
 from ariadne.utils.utils import get_environment_variable
@@ -8,6 +9,37 @@ from sqlalchemy.engine import Engine
 
 load_dotenv()
 
+_QUERY_BATCH_SIZE = 1000
+
+
+@functools.lru_cache(maxsize=1)
+def _get_engine() -> Engine:
+    return create_engine(get_environment_variable("VOCAB_CONNECTION_STRING"), pool_pre_ping=True)
+
+
+# Reflected (concept, concept_synonym, concept_ancestor) tables per database URL and schema:
+_reflected_tables: Dict[Tuple[str, str], Tuple[Table, Table, Table]] = {}
+
+
+def _reflect_tables(engine: Engine, vocabulary_schema: str) -> Tuple[Table, Table, Table]:
+    key = (str(engine.url), vocabulary_schema)
+    if key not in _reflected_tables:
+        metadata = MetaData()
+        concept = Table("concept", metadata, schema=vocabulary_schema, autoload_with=engine)
+        concept_synonym = Table("concept_synonym", metadata, schema=vocabulary_schema, autoload_with=engine)
+        concept_ancestor = Table("concept_ancestor", metadata, schema=vocabulary_schema, autoload_with=engine)
+        _reflected_tables[key] = (concept, concept_synonym, concept_ancestor)
+    return _reflected_tables[key]
+
+
+# Context retrieved so far per database URL, schema, and add_concept_context column and flag settings. Each entry
+# holds the context columns and the context row per queried concept ID, or None for concepts the database did not
+# return:
+_context_cache: Dict[tuple, Tuple[List[str], Dict[int, Optional[tuple]]]] = {}
+
+# The number of concepts above which the cached context for a setting is dropped, to bound memory use:
+_MAX_CACHED_CONCEPTS = 100_000
+
 
 def _create_query(
     concept_ids: List[int],
@@ -23,11 +55,7 @@ def _create_query(
     engine: Engine,
 ):
     vocabulary_schema = get_environment_variable("VOCAB_SCHEMA")
-
-    metadata = MetaData()
-    concept = Table("concept", metadata, schema=vocabulary_schema, autoload_with=engine)
-    concept_synonym = Table("concept_synonym", metadata, schema=vocabulary_schema, autoload_with=engine)
-    concept_ancestor = Table("concept_ancestor", metadata, schema=vocabulary_schema, autoload_with=engine)
+    concept, concept_synonym, concept_ancestor = _reflect_tables(engine, vocabulary_schema)
 
     if add_parents:
         parent_concept = concept.alias("parent_concept")
@@ -38,6 +66,7 @@ def _create_query(
             )
             .select_from(concept_ancestor)
             .where(concept_ancestor.c.min_levels_of_separation == 1)
+            .where(concept_ancestor.c.descendant_concept_id.in_(concept_ids))
             .join(parent_concept, concept_ancestor.c.ancestor_concept_id == parent_concept.c.concept_id)
             .group_by(concept_ancestor.c.descendant_concept_id)
             .alias("parent_names")
@@ -50,12 +79,21 @@ def _create_query(
             select(
                 concept_ancestor.c.ancestor_concept_id.label("concept_id"),
                 child_concept.c.concept_name,
+                # Order by a hash of the child ID: the sample looks random, but is the same on every run, so prompts
+                # (and their cached LLM responses) stay the same:
                 func.row_number()
-                .over(partition_by=concept_ancestor.c.ancestor_concept_id, order_by=func.random())
+                .over(
+                    partition_by=concept_ancestor.c.ancestor_concept_id,
+                    order_by=(
+                        func.hashint8(concept_ancestor.c.descendant_concept_id),
+                        concept_ancestor.c.descendant_concept_id,
+                    ),
+                )
                 .label("rn"),
             )
             .select_from(concept_ancestor)
             .where(concept_ancestor.c.min_levels_of_separation == 1)
+            .where(concept_ancestor.c.ancestor_concept_id.in_(concept_ids))
             .join(child_concept, concept_ancestor.c.descendant_concept_id == child_concept.c.concept_id)
             .alias("limited_children")
         )
@@ -79,6 +117,7 @@ def _create_query(
             )
             .select_from(concept_synonym)
             .where(concept_synonym.c.language_concept_id == CONCEPT_SYNONYM_ENGLISH_ID)
+            .where(concept_synonym.c.concept_id.in_(concept_ids))
             .group_by(concept_synonym.c.concept_id)
             .alias("synonym_names")
         )
@@ -124,8 +163,10 @@ def add_concept_context(
 ) -> pd.DataFrame:
     """
     Adds concept context (domain, concept class, vocabulary, parents, children, synonyms) to the given concept table.
-    Multiple entries per concept will be concatenated with semicolons. Children are limited to 10 random entries per
-    concept.
+    Multiple entries per concept will be concatenated with semicolons. Children are limited to an arbitrary but
+    deterministic sample of 10 entries per concept, so the same concept always gets the same context. Context is cached
+    for the lifetime of the process, so concepts that were queried before with the same database, schema, and settings
+    are not queried again.
 
     Args:
         concept_table: DataFrame containing concept IDs.
@@ -144,29 +185,61 @@ def add_concept_context(
         DataFrame enriched with concept context columns.
     """
 
-    engine = create_engine(get_environment_variable("VOCAB_CONNECTION_STRING"))
-
-    concept_ids = concept_table[concept_id_column].unique().tolist()
-    query = _create_query(
-        concept_ids=concept_ids,
-        concept_class_id_column=concept_class_id_column,
-        domain_id_column=domain_id_column,
-        vocabulary_id_column=vocabulary_id_column,
-        add_parents=add_parents,
-        parents_column=parents_column,
-        add_children=add_children,
-        children_column=children_column,
-        add_synonyms=add_synonyms,
-        synonyms_column=synonyms_column,
-        engine=engine,
+    engine = _get_engine()
+    key = (
+        str(engine.url),
+        get_environment_variable("VOCAB_SCHEMA"),
+        domain_id_column,
+        concept_class_id_column,
+        vocabulary_id_column,
+        add_parents,
+        parents_column,
+        add_children,
+        children_column,
+        add_synonyms,
+        synonyms_column,
+    )
+    columns, cached_rows = _context_cache.get(key, (None, {}))
+    requested_ids = concept_table[concept_id_column].unique().tolist()
+    concept_ids = [concept_id for concept_id in requested_ids if concept_id not in cached_rows]
+
+    if columns is None or concept_ids:
+        with engine.connect() as connection:
+            # Query in batches to keep the IN lists bounded. Always run at least one query so the columns are known:
+            for start in range(0, max(len(concept_ids), 1), _QUERY_BATCH_SIZE):
+                batch_ids = concept_ids[start : start + _QUERY_BATCH_SIZE]
+                query = _create_query(
+                    concept_ids=batch_ids,
+                    concept_class_id_column=concept_class_id_column,
+                    domain_id_column=domain_id_column,
+                    vocabulary_id_column=vocabulary_id_column,
+                    add_parents=add_parents,
+                    parents_column=parents_column,
+                    add_children=add_children,
+                    children_column=children_column,
+                    add_synonyms=add_synonyms,
+                    synonyms_column=synonyms_column,
+                    engine=engine,
+                )
+                batch_df = pd.read_sql_query(query, connection).set_index("concept_id")
+                columns = batch_df.columns.tolist()
+                # Also record the IDs the database did not return, so they are not queried again:
+                cached_rows.update(dict.fromkeys(batch_ids))
+                cached_rows.update(zip(batch_df.index, batch_df.itertuples(index=False, name=None)))
+        if len(cached_rows) > _MAX_CACHED_CONCEPTS:
+            _context_cache.pop(key, None)
+        else:
+            _context_cache[key] = (columns, cached_rows)
+
+    # Build the context of the requested concepts only, so the cost does not grow with the size of the cache:
+    found_ids = [concept_id for concept_id in requested_ids if cached_rows.get(concept_id) is not None]
+    context_df = pd.DataFrame(
+        [cached_rows[concept_id] for concept_id in found_ids],
+        index=pd.Index(found_ids, dtype=concept_table[concept_id_column].dtype, name="concept_id"),
+        columns=columns,
     )
 
-    with engine.connect() as connection:
-        result = connection.execute(query)
-        context_df = pd.DataFrame(result.fetchall(), columns=result.keys())
-    merged_df = concept_table.merge(context_df, left_on=concept_id_column, right_on="concept_id", how="left")
-    merged_df.drop(columns=["concept_id"], inplace=True)
-    return merged_df
+    return concept_table.join(context_df, on=concept_id_column, how="left")
 
 
 if __name__ == "__main__":
@@ -1,26 +1,110 @@
 import os
 import re
-from typing import Optional, Tuple, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, List, Dict, Any
 import json
 
+import numpy as np
 import pandas as pd
 
 from ariadne.utils.config import Config
 from ariadne.utils.gen_ai_api import get_llm_response
+from ariadne.utils.llm_cache import LlmCache
+
+_CONTENT_FILTER_RESPONSE = "*Content filter triggered*"
+_JSON_TOKEN_PATTERN = re.compile(r'[{}"\\]')
+_MATCH_LINE_PATTERN = re.compile(r"^#* ?Match ?:.*", flags=re.MULTILINE | re.IGNORECASE)
+_NO_MATCH_PATTERN = re.compile(r"no[ _]match|-1", flags=re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r"\d+")
+_JUSTIFICATION_PATTERN = re.compile(r"Justification[:\-]?(.*)", flags=re.DOTALL | re.IGNORECASE)
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Finds the first balanced JSON object in a text, ignoring braces inside JSON strings. Only braces, quotes and
+    backslashes are visited, so the text is scanned once.
+
+    Args:
+        text: The text containing the JSON object, for example an LLM response.
+
+    Returns:
+        The JSON object as a string, or None if the text contains no balanced JSON object.
+    """
+
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    in_string = False
+    escaped_position = -1
+    for token in _JSON_TOKEN_PATTERN.finditer(text, start):
+        position = token.start()
+        if position == escaped_position:
+            continue
+        char = token.group()
+        if char == "\\":
+            escaped_position = position + 1
+        elif char == '"':
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return text[start : position + 1]
+    return None
+
+
+def _to_concept_id(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class LlmMapper:
-    def __init__(self, config: Config = Config()):
+    def __init__(self, config: Optional[Config] = None):
+        if config is None:
+            config = Config()
         self.system_prompts = config.llm_mapping.system_prompts
         self.context_settings = config.llm_mapping.context
         self.responses_folder = config.system.llm_mapper_responses_folder
+        self.max_concurrent_requests = config.system.max_concurrent_llm_requests
         os.makedirs(self.responses_folder, exist_ok=True)
+        self._cache = LlmCache(os.path.join(self.responses_folder, "llm_cache.sqlite"))
+        # Responses cached by earlier versions as text files. List these once instead of checking files per step:
+        self._legacy_response_files = {
+            entry.name for entry in os.scandir(self.responses_folder) if entry.name.startswith("response_")
+        }
         self._cost = 0.0
+        self._cost_lock = threading.Lock()
+
+        # Names of the target concept fields included in the prompt context, in order:
+        self._context_columns = ["concept_id", "concept_name"]
+        if self.context_settings.include_target_class:
+            self._context_columns.append("concept_class_id")
+        if self.context_settings.include_target_parents:
+            self._context_columns.append("concept_parents")
+        if self.context_settings.include_target_domain:
+            self._context_columns.append("concept_domain")
+        if self.context_settings.include_target_vocabulary:
+            self._context_columns.append("concept_vocabulary")
+        if self.context_settings.include_target_children:
+            self._context_columns.append("concept_children")
+        if self.context_settings.include_target_synonyms:
+            self._context_columns.append("concept_synonyms")
         """
         Initializes the LlmMapper with configuration settings, specific system prompts, and context settings for 
-        LLM-based term mapping. Also sets up a folder to store LLM responses.
+        LLM-based term mapping. Also sets up a folder with a cache of LLM responses.
         """
 
+    def _build_context(self, target_concepts: pd.DataFrame, source_columns: Dict[str, str]) -> pd.DataFrame:
+        context = target_concepts[[source_columns[column] for column in self._context_columns]]
+        return context.set_axis(self._context_columns, axis=1)
+
     def map_term(
         self,
         source_term: str,
@@ -47,7 +131,8 @@ class LlmMapper:
 
         Args:
             source_term: The source clinical term to map.
-            source_id: An optional unique identifier for the source term, used for caching responses.
+            source_id: An optional unique identifier for the source term, used to find responses cached in text files
+                by earlier versions.
             target_concepts: A DataFrame containing candidate target concepts with columns:
             concept_id_column: The name of the column containing target concept IDs.
             concept_name_column: The name of the column containing target concept names.
@@ -67,93 +152,93 @@ class LlmMapper:
         if source_id is None:
             source_id = abs(hash(source_term)) % (10**8)
 
-        input_columns = [concept_id_column, concept_name_column]
-        context_columns = ["concept_id", "concept_name"]
-        if self.context_settings.include_target_class:
-            input_columns.append(concept_class_id_column)
-            context_columns.append("concept_class_id")
-        if self.context_settings.include_target_parents:
-            input_columns.append(parents_column)
-            context_columns.append("concept_parents")
-        if self.context_settings.include_target_domain:
-            input_columns.append(domain_id_column)
-            context_columns.append("concept_domain")
-        if self.context_settings.include_target_vocabulary:
-            input_columns.append(vocabulary_id_column)
-            context_columns.append("concept_vocabulary")
-        if self.context_settings.include_target_children:
-            input_columns.append(children_column)
-            context_columns.append("concept_children")
-        if self.context_settings.include_target_synonyms:
-            input_columns.append(synonyms_column)
-            context_columns.append("concept_synonyms")
-        context = target_concepts[input_columns]
-        context.columns = context_columns
+        context = self._build_context(
+            target_concepts,
+            {
+                "concept_id": concept_id_column,
+                "concept_name": concept_name_column,
+                "concept_class_id": concept_class_id_column,
+                "concept_parents": parents_column,
+                "concept_domain": domain_id_column,
+                "concept_vocabulary": vocabulary_id_column,
+                "concept_children": children_column,
+                "concept_synonyms": synonyms_column,
+            },
+        )
 
         prompt = ""
         for step in range(num_prompts):
-            response_file = os.path.join(self.responses_folder, f"response_{source_id}_s{step + 1}.txt")
+            system_prompt = self.system_prompts[step]
+            if step == 0:
+                context_json = context.to_json(orient="records", lines=True)
+                prompt = f"Source term: {source_term}\n\nCandidate target concepts:\n{context_json}"
 
-            # Load response from file if it exists:
-            if os.path.exists(response_file):
-                with open(response_file, "r", encoding="utf-8") as f:
+            # Load response from the cache, or from a text file written by earlier versions, if it exists:
+            response = self._cache.get(system_prompt, prompt)
+            response_file = f"response_{source_id}_s{step + 1}.txt"
+            if response is None and response_file in self._legacy_response_files:
+                with open(os.path.join(self.responses_folder, response_file), "r", encoding="utf-8") as f:
                     response = f.read()
-                if response == "*Content filter triggered*":
-                    return None, None, None
-            else:
+            if response == _CONTENT_FILTER_RESPONSE:
+                return None, None, None
+            if response is None:
                 # Else generate a new response from the LLM:
-                system_prompt = self.system_prompts[step]
-                if step == 0:
-                    context_json = context.to_json(orient="records", lines=True)
-                    prompt = f"Source term: {source_term}\n\nCandidate target concepts:\n{context_json}"
-
                 response_with_usage = get_llm_response(prompt, system_prompt)
                 response = response_with_usage["content"]
                 if not response:
                     # We hit the content filter:
-                    with open(response_file, "w", encoding="utf-8") as f:
-                        f.write("*Content filter triggered*")
+                    self._cache.set(system_prompt, prompt, _CONTENT_FILTER_RESPONSE)
                     return None, None, None
-                self._cost = self._cost + response_with_usage["usage"]["total_cost_usd"]
+                cost = response_with_usage["usage"]["total_cost_usd"]
+                with self._cost_lock:
+                    self._cost = self._cost + cost
 
                 if step == 0 and self.context_settings.re_insert_target_details:
                     # Re-insert target details into the response JSON for the next step:
-                    response_json_match = re.search(r"{.*}", response, flags=re.DOTALL)
-                    if response_json_match:
-                        response_json_str = response_json_match.group(0)
+                    response_json_str = _extract_json_object(response)
+                    if response_json_str:
                         try:
                             data = json.loads(response_json_str)
-                            target_definitions = data["target_concepts"]
-                            target_definitions = pd.DataFrame(target_definitions)
-                            target_definitions["id"] = pd.to_numeric(target_definitions["id"], errors="coerce")
-                            merged = pd.merge(
-                                target_definitions, context, left_on="id", right_on="concept_id", how="left"
-                            )
-                            merged = merged.drop(columns=["concept_id"])
+                            details_by_id = {}
+                            for record in context.to_dict(orient="records"):
+                                details_by_id.setdefault(record.pop("concept_id"), record)
+                            # Concepts not in the context get NaN details, as with a left join:
+                            missing_details = dict.fromkeys(context.columns.drop("concept_id"), float("nan"))
+                            target_concepts_with_details = []
+                            for target_definition in data["target_concepts"]:
+                                concept_id = _to_concept_id(target_definition["id"])
+                                details = details_by_id.get(concept_id, missing_details)
+                                target_concepts_with_details.append({**target_definition, "id": concept_id, **details})
                             new_data = {
                                 "source_term": data["source_term"],
-                                "target_concepts": merged.to_dict(orient="records"),
+                                "target_concepts": target_concepts_with_details,
                             }
                             response = json.dumps(new_data, indent=2)
                         except Exception as e:
                             print(f"Warning: Could not re-insert target details: {e}")
+                    elif "{" in response:
+                        print("Warning: Could not re-insert target details: unbalanced JSON in response")
 
-                with open(response_file, "w", encoding="utf-8") as f:
-                    f.write(response)
+                self._cache.set(system_prompt, prompt, response, cost)
             if step < num_prompts - 1:
                 # Use the response as the prompt for the next step:
                 prompt = response
 
+        # Index concept names by concept ID (reversed, so the first row of a duplicate ID wins):
+        concept_names = dict(
+            zip(target_concepts[concept_id_column].tolist()[::-1], target_concepts[concept_name_column].tolist()[::-1])
+        )
+
         # Process the final response to extract the match:
         response = response.replace("**", "")
-        match = re.findall(r"^#* ?Match ?:.*", response, flags=re.MULTILINE | re.IGNORECASE)
+        match = _MATCH_LINE_PATTERN.findall(response)
         if match:
             # Parse legacy format:
-            if re.search("no[ _]match|-1", match[-1], re.IGNORECASE):
+            if _NO_MATCH_PATTERN.search(match[-1]):
                 match_value_int = -1
                 concept_name = "no_match"
             else:
-                number_match = re.findall(r"\d+", match[-1])
+                number_match = _NUMBER_PATTERN.findall(match[-1])
                 if not number_match:
                     raise ValueError(f"No numeric match found in response: {response}")
                 number_match_value = number_match[0]
@@ -161,12 +246,11 @@ class LlmMapper:
                     match_value_int = int(number_match_value)
                 except ValueError:
                     raise ValueError(f"Match value '{number_match_value}' is not a valid integer.")
-                matched_row = target_concepts[target_concepts[concept_id_column] == match_value_int]
-                if matched_row.empty:
+                if match_value_int not in concept_names:
                     raise ValueError(f"Match '{number_match_value}' not found in search results.")
-                concept_name = str(matched_row.iloc[0][concept_name_column])
+                concept_name = str(concept_names[match_value_int])
             # Extract the rationale if provided.
-            rationale_match = re.search(r"Justification[:\-]?(.*)", response, flags=re.DOTALL | re.IGNORECASE)
+            rationale_match = _JUSTIFICATION_PATTERN.search(response)
             rationale = ""
             if rationale_match:
                 rationale = rationale_match.group(1).strip()
@@ -175,23 +259,22 @@ class LlmMapper:
             return match_value_int, concept_name, rationale
         else:
             # Parse JSON format:
-            response_json_match = re.search(r"{.*}", response, flags=re.DOTALL)
-            if response_json_match:
-                response_json_str = response_json_match.group(0)
-                data = json.loads(response_json_str)
-                justification = data["justification"]
-                if not data["match_found"]:
-                    return -1, "no_match", justification
-                else:
-                    try:
-                        match_value_int = int(data["concept_id"])
-                    except ValueError:
-                        raise ValueError(f"Match value '{data["concept_id"]}' is not a valid integer.")
-                    matched_row = target_concepts[target_concepts[concept_id_column] == match_value_int]
-                    if matched_row.empty:
-                        raise ValueError(f"Match '{match_value_int}' not found in search results.")
-                    concept_name = str(matched_row.iloc[0][concept_name_column])
-                    return match_value_int, concept_name, justification
+            response_json_str = _extract_json_object(response)
+            if not response_json_str:
+                raise ValueError(f"No match or JSON found in response: {response}")
+            data = json.loads(response_json_str)
+            justification = data["justification"]
+            if not data["match_found"]:
+                return -1, "no_match", justification
+            else:
+                try:
+                    match_value_int = int(data["concept_id"])
+                except ValueError:
+                    raise ValueError(f"Match value '{data["concept_id"]}' is not a valid integer.")
+                if match_value_int not in concept_names:
+                    raise ValueError(f"Match '{match_value_int}' not found in search results.")
+                concept_name = str(concept_names[match_value_int])
+                return match_value_int, concept_name, justification
 
     def map_terms(
         self,
@@ -218,9 +301,12 @@ class LlmMapper:
 
         The input DataFrame should contain multiple rows per source term, one for each candidate target concept.
 
-        Be aware that LLM responses are cached based on source term and source ID, so if the same term appears
-        multiple times with the same source ID, the cached response will be used. The cache is stored in the
-        llm_mapper_responses_folder specified in the config.
+        Be aware that LLM responses are cached based on the LLM model, system prompt, and prompt, so if the same prompt
+        is sent again, the cached response will be used. The cache is stored in the llm_mapper_responses_folder
+        specified in the config.
+
+        Each distinct term is mapped once, and its mapping is copied to all source IDs with that term. Up to
+        max_concurrent_llm_requests (specified in the config) terms are mapped concurrently.
 
         Args:
             source_target_concepts: DataFrame containing the source clinical terms and candidate target concepts.
@@ -243,18 +329,35 @@ class LlmMapper:
             A DataFrame with the original terms and their mapped concept IDs and names.
         """
 
-        mapped_data = []
-        grouped = source_target_concepts.groupby(term_column)
-        for term, group in grouped:
-            source_id = None
-            if source_id_column and source_id_column in group.columns:
-                source_id = str(group.iloc[0][source_id_column])
-                if source_ids is not None and source_id not in source_ids:
-                    continue
-            matched_concept_id, matched_concept_name, match_rationale = self.map_term(
-                term,
-                source_id,
-                group,
+        source_target_concepts = source_target_concepts.dropna(subset=[term_column])
+        has_source_id = bool(source_id_column) and source_id_column in source_target_concepts.columns
+        if has_source_id:
+            row_source_ids = source_target_concepts[source_id_column].astype(str)
+            if source_ids is not None:
+                is_selected = row_source_ids.isin(source_ids)
+                source_target_concepts = source_target_concepts[is_selected]
+                row_source_ids = row_source_ids[is_selected]
+
+        # Sort by term, so the candidate concepts of each term are a contiguous slice of rows:
+        order = np.argsort(source_target_concepts[term_column].to_numpy(), kind="stable")
+        sorted_concepts = source_target_concepts.iloc[order]
+        all_terms = sorted_concepts[term_column].to_numpy()
+        is_first = np.ones(len(all_terms), dtype=bool)
+        is_first[1:] = all_terms[1:] != all_terms[:-1]
+        starts = np.flatnonzero(is_first)
+        ends = np.append(starts[1:], len(all_terms))
+        terms = all_terms[starts].tolist()
+        if has_source_id:
+            row_source_ids = row_source_ids.iloc[order]
+            task_source_ids = row_source_ids.to_numpy()[starts].tolist()
+        else:
+            task_source_ids = [None] * len(terms)
+
+        def map_task(i: int) -> Tuple[int | None, str | None, str | None]:
+            return self.map_term(
+                terms[i],
+                task_source_ids[i],
+                sorted_concepts.iloc[starts[i] : ends[i]],
                 concept_id_column,
                 concept_name_column,
                 domain_id_column,
@@ -264,20 +367,31 @@ class LlmMapper:
                 children_column,
                 synonyms_column,
             )
-            if matched_concept_id is None:
-                # Content filter was hit:
-                continue
-            mapped_data.append(
-                {
-                    term_column: term,
-                    source_id_column: source_id,
-                    source_term_column: group.iloc[0][source_term_column],
-                    mapped_concept_id_column: matched_concept_id,
-                    mapped_concept_name_column: matched_concept_name,
-                    mapped_rationale_column: match_rationale,
-                }
-            )
-        return pd.DataFrame(mapped_data)
+
+        # Each distinct term is mapped once. LLM calls are network-bound, so send multiple requests concurrently:
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            results = list(executor.map(map_task, range(len(terms))))
+
+        # Skip terms where the content filter was hit:
+        mapped = [i for i, result in enumerate(results) if result[0] is not None]
+        mapped_terms = pd.DataFrame(
+            {
+                term_column: all_terms[starts[mapped]],
+                mapped_concept_id_column: [results[i][0] for i in mapped],
+                mapped_concept_name_column: [results[i][1] for i in mapped],
+                mapped_rationale_column: [results[i][2] for i in mapped],
+            }
+        )
+
+        # Copy the mapping of each term to all its source IDs:
+        source_rows = pd.DataFrame(
+            {
+                term_column: all_terms,
+                source_id_column: row_source_ids.to_numpy() if has_source_id else None,
+                source_term_column: sorted_concepts[source_term_column].to_numpy(),
+            }
+        ).drop_duplicates()
+        return source_rows.merge(mapped_terms, on=term_column, how="inner")
 
     def get_total_cost(self) -> float:
         """
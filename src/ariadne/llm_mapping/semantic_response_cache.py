@@ -0,0 +1,233 @@
+# Copyright 2025 Observational Health Data Sciences and Informatics
+#
+# This file is part of Ariadne
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from ariadne.llm_mapping.llm_mapper import LlmMapper
+from ariadne.utils.config import Config
+from ariadne.utils.gen_ai_api import get_embedding_vectors
+
+
+def _can_reuse(mapping: Dict[str, Any], candidate_ids: Set[int]) -> bool:
+    if mapping["concept_id"] != -1:
+        return mapping["concept_id"] in candidate_ids
+    # Mappings cached without their candidates cannot be checked, so their no-matches are never reused:
+    cached_candidate_ids = mapping.get("candidate_ids")
+    return cached_candidate_ids is not None and candidate_ids.issubset(cached_candidate_ids)
+
+
+class SemanticResponseCache:
+    """
+    Wraps an LlmMapper so that source terms that are near-duplicates of previously mapped terms reuse the earlier
+    mapping instead of prompting the LLM again. Terms are compared using the cosine similarity of their embedding
+    vectors. A cached mapping is only reused if the mapped concept is among the candidate target concepts of the new
+    term. A cached 'no match' is only reused if all candidate target concepts of the new term were also candidates of
+    the cached term, since a no-match only holds for the candidates the LLM was shown.
+
+    The cache is stored in the responses folder of the LlmMapper.
+    """
+
+    def __init__(self, llm_mapper: LlmMapper, config: Optional[Config] = None):
+        """
+        Initializes the SemanticResponseCache, loading previously cached mappings if they exist.
+
+        Args:
+            llm_mapper: The LlmMapper to use for terms that are not in the cache.
+            config: The config specifying the minimum cosine similarity for a cached term to be considered a match
+                (llm_mapping.semantic_cache_threshold). If None, the default config is loaded.
+        """
+        if config is None:
+            config = Config()
+        self.llm_mapper = llm_mapper
+        self.similarity_threshold = config.llm_mapping.semantic_cache_threshold
+        self._embeddings_file = os.path.join(llm_mapper.responses_folder, "semantic_cache_embeddings.npy")
+        self._mappings_file = os.path.join(llm_mapper.responses_folder, "semantic_cache_mappings.json")
+        self._cost = 0.0
+        if os.path.exists(self._embeddings_file) and os.path.exists(self._mappings_file):
+            self._embeddings = np.load(self._embeddings_file)
+            with open(self._mappings_file, "r", encoding="utf-8") as f:
+                self._mappings = json.load(f)
+        else:
+            self._embeddings = None
+            self._mappings = []
+
+    def map_terms(
+        self,
+        source_target_concepts: pd.DataFrame,
+        term_column: str = "cleaned_term",
+        source_id_column: Optional[str] = "source_concept_id",
+        source_term_column: Optional[str] = "source_term",
+        concept_id_column: str = "matched_concept_id",
+        mapped_concept_id_column: str = "mapped_concept_id",
+        mapped_concept_name_column: str = "mapped_concept_name",
+        mapped_rationale_column: str = "mapped_rationale",
+        source_ids: List[str] | None = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """
+        Maps source terms in a DataFrame column to target concepts, reusing cached mappings of semantically similar
+        terms, and using the LlmMapper for all other terms.
+
+        Args:
+            source_target_concepts: DataFrame containing the source clinical terms and candidate target concepts.
+            term_column: The name of the column containing source terms fed to the LLM.
+            source_id_column: The name of the column containing the unique source term IDs.
+            source_term_column: The name of the column containing the original source terms.
+            concept_id_column: The name of the column containing the target concept IDs.
+            mapped_concept_id_column: The name of the output column for mapped concept IDs.
+            mapped_concept_name_column: The name of the output column for mapped concept names.
+            mapped_rationale_column: The name of the output column for mapping rationale.
+            source_ids: (Optional): A list of source IDs to restrict to.
+            **kwargs: Additional arguments passed to LlmMapper.map_terms().
+
+        Returns:
+            A DataFrame with the original terms and their mapped concept IDs and names.
+        """
+
+        has_source_id = source_id_column and source_id_column in source_target_concepts.columns
+        if source_ids is not None and has_source_id:
+            source_target_concepts = source_target_concepts[
+                source_target_concepts[source_id_column].astype(str).isin(source_ids)
+            ]
+        terms = source_target_concepts[term_column].dropna().unique().tolist()
+        if not terms:
+            return pd.DataFrame()
+
+        vectors_with_usage = get_embedding_vectors(terms)
+        self._cost = self._cost + vectors_with_usage["usage"]["total_cost_usd"]
+        # The embeddings are already a contiguous float32 array, so normalize them in place rather than copying:
+        embeddings = np.asarray(vectors_with_usage["embeddings"], dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        candidate_rows = source_target_concepts.dropna(subset=[concept_id_column])
+        candidate_ids = (
+            candidate_rows.groupby(term_column)[concept_id_column].agg(lambda ids: set(ids.astype(int).tolist()))
+        )
+        cached_mappings = []
+        is_cached = np.zeros(len(terms), dtype=bool)
+        if self._embeddings is not None:
+            similarities = embeddings @ self._embeddings.T
+            best_matches = similarities.argmax(axis=1)
+            best_similarities = similarities[np.arange(len(terms)), best_matches]
+            for i in np.flatnonzero(best_similarities >= self.similarity_threshold):
+                mapping = self._mappings[best_matches[i]]
+                if not _can_reuse(mapping, candidate_ids.get(terms[i], set())):
+                    continue
+                is_cached[i] = True
+                cached_mappings.append(
+                    {
+                        term_column: terms[i],
+                        mapped_concept_id_column: mapping["concept_id"],
+                        mapped_concept_name_column: mapping["concept_name"],
+                        mapped_rationale_column: mapping["rationale"],
+                    }
+                )
+        if cached_mappings:
+            # Copy the mapping of each term to all its source IDs, as LlmMapper.map_terms does:
+            source_rows = pd.DataFrame(
+                {
+                    term_column: source_target_concepts[term_column].to_numpy(),
+                    source_id_column: (
+                        source_target_concepts[source_id_column].astype(str).to_numpy() if has_source_id else None
+                    ),
+                    source_term_column: source_target_concepts[source_term_column].to_numpy(),
+                }
+            ).drop_duplicates()
+            cached_terms = source_rows.merge(pd.DataFrame(cached_mappings), on=term_column, how="inner")
+        else:
+            cached_terms = pd.DataFrame()
+
+        uncached_terms = [term for term, cached in zip(terms, is_cached) if not cached]
+        mapped_terms = self.llm_mapper.map_terms(
+            source_target_concepts[source_target_concepts[term_column].isin(uncached_terms)],
+            term_column=term_column,
+            source_id_column=source_id_column,
+            source_term_column=source_term_column,
+            concept_id_column=concept_id_column,
+            mapped_concept_id_column=mapped_concept_id_column,
+            mapped_concept_name_column=mapped_concept_name_column,
+            mapped_rationale_column=mapped_rationale_column,
+            **kwargs,
+        )
+        if not mapped_terms.empty:
+            self._add_to_cache(
+                embeddings,
+                terms,
+                candidate_ids,
+                mapped_terms,
+                term_column,
+                mapped_concept_id_column,
+                mapped_concept_name_column,
+                mapped_rationale_column,
+            )
+
+        results = [result for result in (cached_terms, mapped_terms) if not result.empty]
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, ignore_index=True)
+
+    def _add_to_cache(
+        self,
+        embeddings: np.ndarray,
+        terms: List[str],
+        candidate_ids: pd.Series,
+        mapped_terms: pd.DataFrame,
+        term_column: str,
+        mapped_concept_id_column: str,
+        mapped_concept_name_column: str,
+        mapped_rationale_column: str,
+    ) -> None:
+        mapped_terms = mapped_terms.drop_duplicates(subset=term_column)
+        term_index = {term: i for i, term in enumerate(terms)}
+        new_embeddings = embeddings[[term_index[term] for term in mapped_terms[term_column]]]
+        if self._embeddings is None:
+            self._embeddings = new_embeddings
+        else:
+            self._embeddings = np.vstack([self._embeddings, new_embeddings])
+        for term, concept_id, concept_name, rationale in zip(
+            mapped_terms[term_column],
+            mapped_terms[mapped_concept_id_column],
+            mapped_terms[mapped_concept_name_column],
+            mapped_terms[mapped_rationale_column],
+        ):
+            self._mappings.append(
+                {
+                    "term": term,
+                    "concept_id": int(concept_id),
+                    "concept_name": concept_name,
+                    "rationale": rationale,
+                    "candidate_ids": sorted(candidate_ids.get(term, set())),
+                }
+            )
+
+        np.save(self._embeddings_file, self._embeddings)
+        with open(self._mappings_file, "w", encoding="utf-8") as f:
+            json.dump(self._mappings, f)
+
+    def get_total_cost(self) -> float:
+        """
+        Returns the total cost incurred for LLM and embedding calls
+
+        Returns:
+            Total cost in USD.
+        """
+
+        return self._cost + self.llm_mapper.get_total_cost()
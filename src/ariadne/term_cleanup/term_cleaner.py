@@ -15,15 +15,36 @@
 # limitations under the License.
 
 import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import re
 from ariadne.utils.gen_ai_api import get_embedding_vectors, get_llm_response
+from ariadne.utils.llm_cache import LlmCache
 from ariadne.utils.utils import get_environment_variable
 from ariadne.utils.config import Config
 import warnings
+from typing import List, Optional
+
+
+# Terms are only sent to the LLM if they contain one of these (lowercase) substrings:
+_TRIGGERS = ("not", "unspecified", "unidentified", "without", "other", " nos", ",nos", " nec", ",nec", "encounter")
+_RESPONSE_PATTERN = re.compile(r"#Term: (.+)$")
+_BATCH_RESPONSE_PATTERN = re.compile(r"^#Cleaned (\d+):\s*(.+)$", flags=re.MULTILINE)
+_BATCH_INSTRUCTIONS = """
+
+# Multiple terms
+You may be given multiple numbered terms, one per line, formatted as '#Term <number>: <term>'. Clean each term
+independently, and output each extracted term on its own line as '#Cleaned <number>: <extracted term>', using the same
+number as the input term.
+"""
 
 
-_TRIGGER_PATTERN = r"not|unspecified|unidentified|without|other| nos|,nos| nec|,nec|encounter"
+def _needs_cleaning(term: str) -> bool:
+    # Plain substring checks are much faster than a case-insensitive regex:
+    term = term.lower()
+    return any(trigger in term for trigger in _TRIGGERS)
 
 
 class TermCleaner:
@@ -31,9 +52,28 @@ class TermCleaner:
     A class to clean clinical terms by removing non-essential modifiers and information using a Large Language Model (LLM).
     """
 
-    def __init__(self, config: Config = Config()):
+    def __init__(self, config: Optional[Config] = None):
+        if config is None:
+            config = Config()
         self.system_prompt = config.term_cleaning.system_prompt
+        self.max_concurrent_requests = config.system.max_concurrent_llm_requests
         self.cost = 0.0
+        self._cost_lock = threading.Lock()
+        cache_file = config.system.term_cleaner_cache_file
+        self._cache = LlmCache(cache_file) if cache_file is not None else None
+
+    def _get_llm_response(self, prompt: str, system_prompt: str) -> str | None:
+        if self._cache is not None:
+            response = self._cache.get(system_prompt, prompt)
+            if response is not None:
+                return response
+        response = get_llm_response(prompt=prompt, system_prompt=system_prompt)
+        cost = response["usage"]["total_cost_usd"]
+        with self._cost_lock:
+            self.cost += cost
+        if self._cache is not None and response["content"] is not None:
+            self._cache.set(system_prompt, prompt, response["content"], cost)
+        return response["content"]
 
     def clean_term(self, term: str) -> str:
         """
@@ -46,35 +86,84 @@ class TermCleaner:
             The cleaned clinical term.
         """
 
-        if re.search(_TRIGGER_PATTERN, term, flags=re.IGNORECASE) is None:
+        if not _needs_cleaning(term):
             return term
         prompt = f"#Term: {term}"
-        response = get_llm_response(prompt=prompt, system_prompt=self.system_prompt)
-        self.cost += response["usage"]["total_cost_usd"]
-        pattern = r"#Term: (.+)$"
-        match = re.match(pattern, response["content"].strip())
+        response = self._get_llm_response(prompt, self.system_prompt)
+        if response is None:
+            warnings.warn(f"No response content for term {term}")
+            return term
+        match = _RESPONSE_PATTERN.match(response.strip())
         if match:
             return match.group(1)  # Returns the captured answer
         else:
             warnings.warn(f"Term {term} not found in response {response}")
             return term
 
+    def clean_terms_batch(self, terms: List[str], batch_size: int = 32) -> List[str]:
+        """
+        Cleans multiple clinical terms, sending up to batch_size terms to the LLM in a single prompt. Each distinct term
+        is cleaned only once, and up to max_concurrent_llm_requests (specified in the config) prompts are sent
+        concurrently. Terms missing from a batch response are cleaned individually.
+
+        Args:
+            terms: The clinical terms to be cleaned.
+            batch_size: The maximum number of terms per prompt. Use 1 to prompt for each term separately.
+
+        Returns:
+            The cleaned clinical terms, in the same order as the input terms.
+        """
+
+        cleaned_terms = {}
+        terms_to_clean = []
+        for term in dict.fromkeys(terms):
+            if _needs_cleaning(term):
+                terms_to_clean.append(term)
+            else:
+                cleaned_terms[term] = term
+        batches = [terms_to_clean[i : i + batch_size] for i in range(0, len(terms_to_clean), batch_size)]
+
+        # LLM calls are network-bound, so send multiple requests concurrently:
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            for batch, cleaned_batch in zip(batches, executor.map(self._clean_batch, batches)):
+                cleaned_terms.update(zip(batch, cleaned_batch))
+        return [cleaned_terms[term] for term in terms]
+
+    def _clean_batch(self, terms: List[str]) -> List[str]:
+        if len(terms) == 1:
+            return [self.clean_term(terms[0])]
+        prompt = "\n".join(f"#Term {i}: {term}" for i, term in enumerate(terms, start=1))
+        response = self._get_llm_response(prompt, self.system_prompt + _BATCH_INSTRUCTIONS)
+
+        # If the batch was blocked (e.g. by a content filter) or answers are missing, fall back to single terms:
+        content = response or ""
+        cleaned = {int(number): term.strip() for number, term in _BATCH_RESPONSE_PATTERN.findall(content)}
+        return [cleaned[i] if i in cleaned else self.clean_term(term) for i, term in enumerate(terms, start=1)]
+
     def clean_terms(
-        self, df: pd.DataFrame, term_column: str = "source_term", output_column: str = "cleaned_term"
+        self,
+        df: pd.DataFrame,
+        term_column: str = "source_term",
+        output_column: str = "cleaned_term",
+        batch_size: int = 1,
     ) -> pd.DataFrame:
         """
-        Cleans clinical terms in a DataFrame column using the LLM.
+        Cleans clinical terms in a DataFrame column using the LLM. Each distinct term is cleaned only once. Up to
+        max_concurrent_llm_requests (specified in the config) prompts are sent concurrently.
 
         Args:
             df: DataFrame containing the terms to be cleaned.
             term_column: Name of the column with terms to be cleaned.
             output_column: Name of the column to store cleaned terms.
+            batch_size: The maximum number of terms per prompt. Larger batches require fewer LLM calls.
 
         Returns:
             DataFrame with an additional column for cleaned terms.
         """
 
-        df[output_column] = df[term_column].apply(self.clean_term)
+        unique_terms = df[term_column].unique().tolist()
+        cleaned_terms = self.clean_terms_batch(unique_terms, batch_size=batch_size)
+        df[output_column] = df[term_column].map(dict(zip(unique_terms, cleaned_terms)))
         return df
 
     def get_total_cost(self) -> float:
@@ -14,16 +14,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from dataclasses import dataclass, field, fields, is_dataclass
+import copy
+import functools
+from dataclasses import asdict, dataclass, fields, is_dataclass
 from pathlib import Path
-from typing import List, Optional, Any, Type, Dict
+from typing import List, Optional, Any, Type, Dict, Tuple
 import yaml
 
 from ariadne.utils.utils import get_project_root, resolve_path
 from spacy.util import from_dict
 
 
-@dataclass
+# Use the libyaml-based loader if PyYAML was built with it:
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_yaml(path: str, mtime: float) -> Dict[str, Any]:
+    # The modification time is part of the cache key, so edited files are reloaded:
+    with open(path, "r", encoding="utf-8") as fh:
+        return yaml.load(fh, Loader=_YAML_LOADER) or {}
+
+
+@functools.lru_cache(maxsize=None)
+def _field_specs(dc_type: Type[Any]) -> Tuple[Tuple[str, Any, bool], ...]:
+    # The name, type, and whether the type is a nested dataclass, of each field of a dataclass:
+    return tuple((f.name, f.type, is_dataclass(f.type)) for f in fields(dc_type))
+
+
+@dataclass(slots=True)
 class SystemConfig:
     log_folder: Path
     terms_folder: Path
@@ -31,15 +50,22 @@ class SystemConfig:
     llm_mapper_responses_folder: Path
     download_batch_size: int
     max_cores: int
+    max_concurrent_llm_requests: int = 8
+    term_cleaner_cache_file: Optional[Path] = None
+    embedding_cache_file: Optional[Path] = None
 
     def __post_init__(self):
         self.log_folder = resolve_path(self.log_folder)
         self.terms_folder = resolve_path(self.terms_folder)
         self.verbatim_mapping_index_file = resolve_path(self.verbatim_mapping_index_file)
         self.llm_mapper_responses_folder = resolve_path(self.llm_mapper_responses_folder)
+        if self.term_cleaner_cache_file is not None:
+            self.term_cleaner_cache_file = resolve_path(self.term_cleaner_cache_file)
+        if self.embedding_cache_file is not None:
+            self.embedding_cache_file = resolve_path(self.embedding_cache_file)
 
 
-@dataclass
+@dataclass(slots=True)
 class StandardConceptFilter:
     vocabularies: Optional[List[str]]
     domain_ids: Optional[List[str]]
@@ -47,23 +73,24 @@ class StandardConceptFilter:
     include_synonyms: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class VerbatimMapping:
     substrings_to_remove: List[str]
     standard_concept_filter: StandardConceptFilter
+    lemmatizer_mode: str = "model"
 
 
-@dataclass
+@dataclass(slots=True)
 class TermCleaning:
     system_prompt: str
 
 
-@dataclass
+@dataclass(slots=True)
 class VectorSearch:
     max_candidates: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Context:
     include_target_parents: bool
     include_target_children: bool
@@ -74,10 +101,11 @@ class Context:
     re_insert_target_details: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class Llm_mapping:
     context: Context
     system_prompts: List[str]
+    semantic_cache_threshold: float = 0.95
 
 
 class Config:
@@ -86,11 +114,11 @@ class Config:
     configuration parameters.
     """
 
-    system: SystemConfig = field(default_factory=SystemConfig)
-    verbatim_mapping: VerbatimMapping = field(default_factory=VerbatimMapping)
-    term_cleaning: TermCleaning = field(default_factory=TermCleaning)
-    vector_search: VectorSearch = field(default_factory=VectorSearch)
-    llm_mapping: Llm_mapping = field(default_factory=Llm_mapping)
+    system: SystemConfig
+    verbatim_mapping: VerbatimMapping
+    term_cleaning: TermCleaning
+    vector_search: VectorSearch
+    llm_mapping: Llm_mapping
 
     def __init__(self, filename: str = "config.yaml"):
         """
@@ -106,8 +134,8 @@ class Config:
             path = get_project_root() / filename
             if not path.exists():
                 raise FileNotFoundError(f"Could not find {filename} in {Path.cwd()} or project root.")
-        with path.open("r", encoding="utf-8") as fh:
-            raw = yaml.safe_load(fh) or {}
+        # Copy the cached YAML, so changes to one Config do not affect others:
+        raw = copy.deepcopy(_load_yaml(str(path), path.stat().st_mtime))
 
         self.system = self.from_dict(SystemConfig, raw["system"])
         self.verbatim_mapping = self.from_dict(VerbatimMapping, raw["verbatim_mapping"])
@@ -120,37 +148,25 @@ class Config:
             if not is_dataclass(dc_type):
                 return subdata
             kw = {}
-            for f in fields(dc_type):
-                if subdata is None or f.name not in subdata:
+            for name, field_type, is_nested in _field_specs(dc_type):
+                if subdata is None or name not in subdata:
                     continue
-                value = subdata[f.name]
-                if is_dataclass(f.type):
-                    kw[f.name] = build(f.type, value or {})
+                value = subdata[name]
+                if is_nested:
+                    kw[name] = build(field_type, value or {})
                 else:
-                    kw[f.name] = value
+                    kw[name] = value
             return dc_type(**kw)
 
         return build(cls, data)
 
     def to_dict(self) -> Dict[str, Any]:
-        def serialize(obj: Any) -> Any:
-            if is_dataclass(obj):
-                result = {}
-                for f in fields(obj):
-                    value = getattr(obj, f.name)
-                    result[f.name] = serialize(value)
-                return result
-            elif isinstance(obj, list):
-                return [serialize(item) for item in obj]
-            else:
-                return obj
-
         return {
-            "system": serialize(self.system),
-            "verbatim_mapping": serialize(self.verbatim_mapping),
-            "term_cleaning": serialize(self.term_cleaning),
-            "vector_search": serialize(self.vector_search),
-            "llm_mapping": serialize(self.llm_mapping),
+            "system": asdict(self.system),
+            "verbatim_mapping": asdict(self.verbatim_mapping),
+            "term_cleaning": asdict(self.term_cleaning),
+            "vector_search": asdict(self.vector_search),
+            "llm_mapping": asdict(self.llm_mapping),
         }
 
 
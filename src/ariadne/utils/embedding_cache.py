@@ -0,0 +1,70 @@
+# Copyright 2025 Observational Health Data Sciences and Informatics
+#
+# This file is part of Ariadne
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from ariadne.utils.sqlite_cache import SqliteCache
+
+
+class EmbeddingCache(SqliteCache):
+    """
+    A persistent cache of embedding vectors, stored in a SQLite database. Vectors are keyed by a hash of the embedding
+    model name (the EMBEDDING_MODEL environment variable) and the text. The cache can be shared between threads.
+    """
+
+    def __init__(self, filename: str | Path):
+        """
+        Initializes the EmbeddingCache, creating the database file if it does not exist.
+
+        Args:
+            filename: The path to the SQLite database file.
+        """
+
+        super().__init__(filename, "embedding", {"vector": "BLOB"}, model_variable="EMBEDDING_MODEL")
+
+    def get(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Retrieves cached embedding vectors.
+
+        Args:
+            texts: The texts to retrieve the embedding vectors for.
+
+        Returns:
+            For each text, the float32 embedding vector, or None if the text is not in the cache.
+        """
+
+        keys = [self._get_key(text) for text in texts]
+        found = self._get_values(keys)
+        return [None if key not in found else np.frombuffer(found[key][0], dtype=np.float32) for key in keys]
+
+    def set(self, texts: List[str], vectors: np.ndarray) -> None:
+        """
+        Stores embedding vectors in the cache.
+
+        Args:
+            texts: The texts that were embedded.
+            vectors: The embedding vectors, one row per text.
+        """
+
+        self._set_values(
+            [
+                (self._get_key(text), np.asarray(vector, dtype=np.float32).tobytes())
+                for text, vector in zip(texts, vectors)
+            ]
+        )
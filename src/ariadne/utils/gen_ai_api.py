@@ -1,4 +1,8 @@
+import functools
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from ariadne.utils.utils import get_environment_variable
 from openai import OpenAI, AzureOpenAI
@@ -19,7 +23,33 @@ _PRICING_TABLE = {
     "local": {"input": 0.00, "output": 0.00},
 }
 
+# Matches the pricing key contained in a model name, preferring the longest key (e.g. 'gpt-4o-mini' over 'gpt-4o'):
+_PRICING_PATTERN = re.compile("|".join(map(re.escape, sorted(_PRICING_TABLE, key=len, reverse=True))))
+
+# The OpenAI embedding endpoint accepts at most 2048 inputs per request:
+_MAX_EMBEDDING_BATCH_SIZE = 2048
+_MAX_CONCURRENT_EMBEDDING_REQUESTS = 8
+
 _TEMPERATURE_OK_MODELS = {"gpt-4o", "gpt-4", "gpt-35-turbo", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"}
+# Matches these model names also when embedded in a deployment name such as 'my-gpt-4o-deploy', but not as the prefix
+# of another model name such as 'gpt-4.1':
+_TEMPERATURE_OK_PATTERN = re.compile(
+    r"(?<![\w.])(?:" + "|".join(map(re.escape, sorted(_TEMPERATURE_OK_MODELS, key=len, reverse=True))) + r")(?![\w.])"
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _create_client(api_key: str, base_url: Optional[str] = None, azure_api_version: Optional[str] = None) -> OpenAI:
+    # Clients are thread-safe and keep a connection pool, so reuse them for the same settings:
+    if azure_api_version is not None:
+        # Seems a bug, but must provide api key in both headers and api-key argument or we get an error:
+        return OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            default_query={"api-version": azure_api_version},
+            default_headers={"api-key": api_key},
+        )
+    return OpenAI(api_key=api_key, base_url=base_url)
 
 
 class _AIClientFactory:
@@ -52,32 +82,26 @@ class _AIClientFactory:
             else:
                 endpoint = get_environment_variable("AZURE_LLM_ENDPOINT")
 
-            # Seems a bug, but must provide api key in both headers and api-key argument or we get an error:
-            client = OpenAI(
-                api_key=api_key,
-                base_url=endpoint,
-                default_query={"api-version": get_environment_variable("AZURE_OPENAI_API_VERSION")},
-                default_headers={"api-key": api_key},
-            )
+            client = _create_client(api_key, endpoint, get_environment_variable("AZURE_OPENAI_API_VERSION"))
             return client, model_name, "azure"
 
         elif provider == "lm-studio":
             endpoint = get_environment_variable("LM_STUDIO_ENDPOINT")
-            client = OpenAI(base_url=endpoint, api_key="lm-studio")
+            client = _create_client("lm-studio", endpoint)
             return client, model_name, "local"
 
         else:  # OpenAI Direct
-            client = OpenAI(api_key=api_key)
+            client = _create_client(api_key)
             return client, model_name, "openai"
 
 
 def _calculate_cost(model_name: str, input_tok: int, output_tok: int, provider_type: str) -> float:
     if provider_type == "local":
         return 0.0
-    price_key = next((k for k in _PRICING_TABLE if k in model_name), None)
-    if not price_key:
+    match = _PRICING_PATTERN.search(model_name)
+    if not match:
         return 0.0
-    prices = _PRICING_TABLE[price_key]
+    prices = _PRICING_TABLE[match.group(0)]
     return round(
         ((input_tok / 1e6) * prices["input"]) + ((output_tok / 1e6) * prices["output"]),
         6,
@@ -86,31 +110,56 @@ def _calculate_cost(model_name: str, input_tok: int, output_tok: int, provider_t
 
 def get_embedding_vectors(texts: List[str]) -> Dict[str, Any]:
     """
-    Generates embedding vectors for a list of texts using the embedding-specific config.
+    Generates embedding vectors for a list of texts using the embedding-specific config. Long lists are split into
+    batches that are sent to the API concurrently.
 
     Args:
         texts: List of texts to generate embeddings for.
 
     Returns:
         A dictionary containing:
-            - "embeddings": A numpy array of embedding vectors.
+            - "embeddings": A float32 numpy array of embedding vectors, one row per text.
             - "usage": A dictionary with token usage and cost details.
     """
 
+    if not texts:
+        # Nothing to embed, so do not call the API (the width of the array is unknown without a response):
+        return {
+            "embeddings": np.empty((0, 0), dtype=np.float32),
+            "usage": {
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "reasoning_tokens": 0,
+                "total_cost_usd": 0.0,
+                "model_used": os.getenv("EMBEDDING_MODEL"),
+            },
+        }
+
     client, model, provider = _AIClientFactory.get_client(task_type="embedding")
 
-    response = client.embeddings.create(input=texts, model=model)
+    starts = range(0, len(texts), _MAX_EMBEDDING_BATCH_SIZE)
+    batches = [texts[start : start + _MAX_EMBEDDING_BATCH_SIZE] for start in starts]
+    if len(batches) == 1:
+        responses = [client.embeddings.create(input=texts, model=model)]
+    else:
+        # Embedding calls are network-bound, so send multiple batches concurrently:
+        with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_EMBEDDING_REQUESTS) as executor:
+            responses = list(executor.map(lambda batch: client.embeddings.create(input=batch, model=model), batches))
 
-    data = sorted(response.data, key=lambda x: x.index)
-    np_vectors = np.array([item.embedding for item in data])
+    # Scatter the vectors by index into a preallocated array instead of sorting. float32 matches the precision of
+    # pgvector's vector type:
+    np_vectors = np.empty((len(texts), len(responses[0].data[0].embedding)), dtype=np.float32)
+    for start, response in zip(starts, responses):
+        for item in response.data:
+            np_vectors[start + item.index] = item.embedding
 
-    usage = response.usage
-    total_cost = _calculate_cost(model, usage.prompt_tokens, 0, provider)
+    input_tokens = sum(response.usage.prompt_tokens for response in responses)
+    total_cost = _calculate_cost(model, input_tokens, 0, provider)
 
     return {
         "embeddings": np_vectors,
         "usage": {
-            "input_tokens": usage.prompt_tokens,
+            "input_tokens": input_tokens,
             "output_tokens": 0,
             "reasoning_tokens": 0,
             "total_cost_usd": total_cost,
@@ -139,7 +188,7 @@ def get_llm_response(prompt: str, system_prompt: Optional[str] = None, show_reas
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": prompt})
 
-    if model in _TEMPERATURE_OK_MODELS:
+    if _TEMPERATURE_OK_PATTERN.search(model):
         temperature = 0.0
     else:
         temperature = None
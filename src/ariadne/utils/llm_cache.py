@@ -0,0 +1,70 @@
+# Copyright 2025 Observational Health Data Sciences and Informatics
+#
+# This file is part of Ariadne
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from pathlib import Path
+from typing import Optional
+
+from ariadne.utils.sqlite_cache import SqliteCache
+
+
+class LlmCache(SqliteCache):
+    """
+    A persistent cache of LLM responses, stored in a SQLite database. Responses are keyed by a hash of the LLM model
+    name (the LLM_MODEL environment variable), the system prompt, and the prompt. The cache can be shared between
+    threads.
+    """
+
+    def __init__(self, filename: str | Path):
+        """
+        Initializes the LlmCache, creating the database file if it does not exist.
+
+        Args:
+            filename: The path to the SQLite database file.
+        """
+
+        super().__init__(
+            filename, "llm_response", {"response": "TEXT", "cost": "REAL", "ts": "INTEGER"}, model_variable="LLM_MODEL"
+        )
+
+    def get(self, system_prompt: Optional[str], prompt: str) -> Optional[str]:
+        """
+        Retrieves a cached LLM response.
+
+        Args:
+            system_prompt: The system prompt sent to the LLM.
+            prompt: The user prompt sent to the LLM.
+
+        Returns:
+            The cached response, or None if the response is not in the cache.
+        """
+
+        key = self._get_key(system_prompt or "", prompt)
+        values = self._get_values([key]).get(key)
+        return None if values is None else values[0]
+
+    def set(self, system_prompt: Optional[str], prompt: str, response: str, cost: float = 0.0) -> None:
+        """
+        Stores an LLM response in the cache.
+
+        Args:
+            system_prompt: The system prompt sent to the LLM.
+            prompt: The user prompt sent to the LLM.
+            response: The response of the LLM.
+            cost: The cost of the LLM call in USD.
+        """
+
+        self._set_values([(self._get_key(system_prompt or "", prompt), response, cost, int(time.time()))])
@@ -17,29 +17,33 @@
 import logging
 import sys
 
+_FILE_FORMATTER = logging.Formatter(fmt="%(asctime)s - %(levelname)-8s %(message)s", datefmt="%m-%d %H:%M")
+# The handlers added to the root logger by open_log, so they can be replaced when it is called again:
+_handlers = []
+
 
 def _add_stream_handler(logger: logging.Logger):
     stream_handler = logging.StreamHandler()
     stream_handler.setLevel(logging.INFO)
     logger.addHandler(stream_handler)
+    _handlers.append(stream_handler)
     return logger
 
 
 def _add_file_handler(logger: logging.Logger, log_file_name: str):
     file_handler = logging.FileHandler(log_file_name, mode="a")
-    formatter = logging.Formatter(
-        fmt="%(asctime)s - %(levelname)-8s %(message)s", datefmt="%m-%d %H:%M"
-    )
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(_FILE_FORMATTER)
     file_handler.setLevel(logging.DEBUG)
     logger.addHandler(file_handler)
+    _handlers.append(file_handler)
     return logger
 
 
 def open_log(log_file_name: str, clear_log_file: bool = False) -> None:
     """
     Sets up the root logger where it writes all logging events to file, and writing events at or above 'info' to
-    console. Events are appended to the log file. The logger will also capture uncaught exceptions.
+    console. Events are appended to the log file. The logger will also capture uncaught exceptions. Calling this again
+    replaces the handlers added by the previous call.
 
     Args:
         log_file_name: The name of the file where the log will be written to.
@@ -49,9 +53,13 @@ def open_log(log_file_name: str, clear_log_file: bool = False) -> None:
         None
     """
 
+    logger = logging.getLogger()
+    while _handlers:
+        handler = _handlers.pop()
+        logger.removeHandler(handler)
+        handler.close()
     if clear_log_file:
         open(log_file_name, "w").close()
-    logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
     if not len(logger.handlers):
         _add_file_handler(logger=logger, log_file_name=log_file_name)
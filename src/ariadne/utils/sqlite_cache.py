@@ -0,0 +1,85 @@
+# Copyright 2025 Observational Health Data Sciences and Informatics
+#
+# This file is part of Ariadne
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+# The maximum number of host parameters in a query was 999 before SQLite 3.32:
+_MAX_QUERY_PARAMETERS = 999
+
+
+class SqliteCache:
+    """
+    Base class for persistent caches stored in a SQLite database table, keyed by a hash of a model name (taken from an
+    environment variable) and one or more strings. The cache can be shared between threads. Subclasses define the value
+    columns and how values are encoded.
+    """
+
+    def __init__(self, filename: str | Path, table: str, value_columns: Dict[str, str], model_variable: str):
+        """
+        Initializes the cache, creating the database file and table if they do not exist.
+
+        Args:
+            filename: The path to the SQLite database file.
+            table: The name of the table holding the cache.
+            value_columns: The names and SQLite types of the value columns.
+            model_variable: The environment variable holding the name of the model, which is part of each key.
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self._connection = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        columns = ", ".join(f"{name} {column_type}" for name, column_type in value_columns.items())
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (key BLOB PRIMARY KEY, {columns})")
+        self._table = table
+        self._value_columns = list(value_columns)
+        self._model_variable = model_variable
+        self._lock = threading.Lock()
+
+    def _get_key(self, *parts: str) -> bytes:
+        model = os.getenv(self._model_variable, "")
+        return hashlib.sha256("|".join((model,) + parts).encode("utf-8")).digest()
+
+    def _get_values(self, keys: Sequence[bytes]) -> Dict[bytes, Tuple[Any, ...]]:
+        # Returns the values of the keys that are in the cache. Keys are looked up in chunks, to stay under SQLite's
+        # limit on the number of query parameters:
+        found = {}
+        query = f"SELECT key, {', '.join(self._value_columns)} FROM {self._table} WHERE key IN "
+        with self._lock:
+            for i in range(0, len(keys), _MAX_QUERY_PARAMETERS):
+                chunk = keys[i : i + _MAX_QUERY_PARAMETERS]
+                for row in self._connection.execute(f"{query}({', '.join('?' * len(chunk))})", chunk):
+                    found[row[0]] = row[1:]
+        return found
+
+    def _set_values(self, rows: List[Tuple[Any, ...]]) -> None:
+        # Each row is a key followed by the values. The connection is in autocommit mode, so use a single explicit
+        # transaction instead of one per row:
+        columns = ["key"] + self._value_columns
+        statement = (
+            f"INSERT OR REPLACE INTO {self._table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        )
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(statement, rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
@@ -15,9 +15,11 @@
 # limitations under the License.
 
 from pathlib import Path
+import functools
 import os
 
 
+@functools.cache
 def get_project_root() -> Path:
     """Returns the path to the project root directory.
 
@@ -46,6 +48,7 @@ def get_environment_variable(name: str) -> str:
     return value
 
 
+@functools.lru_cache(maxsize=256)
 def resolve_path(path: str) -> str:
     """If the path is relative, makes it absolute by prepending the project root.
 
@@ -58,4 +61,6 @@ def resolve_path(path: str) -> str:
     p = Path(path)
     if not p.is_absolute():
         p = get_project_root() / p
-    return str(p.resolve())
+    # The project root is already resolved, so only normalize the path. Unlike Path.resolve(), this needs no file system
+    # calls:
+    return os.path.normpath(p)
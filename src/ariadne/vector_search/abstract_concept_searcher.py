@@ -15,7 +15,8 @@
 # limitations under the License.
 
 from abc import ABC as ABS, abstractmethod
-from typing import Optional
+from typing import Optional, Sequence
+import numpy as np
 import pandas as pd
 
 
@@ -65,3 +66,31 @@ class AbstractConceptSearcher(ABS):
 
         """
         pass
+
+    @staticmethod
+    def _combine_matches(
+        df: pd.DataFrame, matches: pd.DataFrame, counts: Sequence[int], match_rank_column: str
+    ) -> pd.DataFrame:
+        """
+        Combines the rows of a DataFrame with the concepts matched for each row, numbering the matches of each row.
+
+        Args:
+            df: DataFrame containing the terms that were searched.
+            matches: DataFrame with the matching concepts of all rows of df, grouped by row in the order of df, and in
+                order of relevance within each row.
+            counts: For each row in df, the number of matching concepts.
+            match_rank_column: Name of the column to store match ranks.
+
+        Returns:
+            A DataFrame with the columns of df followed by the columns of the matches, with one row per match.
+        """
+
+        if len(matches) == 0:
+            return pd.DataFrame()
+        counts = np.asarray(counts, dtype=np.intp)
+        matches = matches.reset_index(drop=True)
+        # Rank of each match within its row, without iterating over the rows:
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        matches[match_rank_column] = np.arange(1, len(matches) + 1) - starts
+        rows = df.iloc[np.repeat(np.arange(len(df)), counts)].reset_index(drop=True)
+        return pd.concat([rows, matches], axis=1)
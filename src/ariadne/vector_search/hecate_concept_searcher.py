@@ -15,9 +15,16 @@
 # limitations under the License.
 
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
 import requests
+from requests.adapters import HTTPAdapter
 
 import pandas as pd
+from ariadne.utils.config import Config
 from ariadne.vector_search.abstract_concept_searcher import AbstractConceptSearcher
 from pandas.core.interchange.dataframe_protocol import DataFrame
 
@@ -30,14 +37,24 @@ class HecateConceptSearcher(AbstractConceptSearcher):
     A concept searcher that uses the OHDSI Hecate API to find concepts based on query strings.
     """
 
-    def __init__(self, for_evaluation: bool = False):
+    def __init__(self, for_evaluation: bool = False, config: Optional[Config] = None):
         """
         Initializes the HecateConceptSearcher.
 
         Args:
             for_evaluation: If True, configures the searcher for evaluation purposes.
+            config: The config specifying the maximum number of concurrent requests (system.max_cores). If None, the
+                default config is loaded.
         """
+        if config is None:
+            config = Config()
         self.for_evaluation = for_evaluation
+        self.max_concurrent_requests = config.system.max_cores
+
+        # Reuse connections (HTTP keep-alive) across requests, including concurrent ones:
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrent_requests)
+        self._session.mount("https://", adapter)
 
         if for_evaluation:
             print("HecateConceptSearcher initialized in evaluation mode.")
@@ -52,6 +69,23 @@ class HecateConceptSearcher(AbstractConceptSearcher):
             self.default_params = {
                 "standard_concept": "S",
             }
+        # The default parameters never change, so encode them into the URL once:
+        self._search_url = f"{_HECATE_URL}?{urlencode(self.default_params)}"
+        # Results are deterministic for a given query, so remember them (only successful responses are cached):
+        self._fetch_concepts = lru_cache(maxsize=10_000)(self._fetch_concepts)
+
+    def _fetch_concepts(self, query_string: str, limit: int) -> Tuple[Dict[str, Any], ...]:
+        params = (("q", query_string), ("limit", limit))
+        response = self._session.get(self._search_url, params=params, timeout=15)
+        response.raise_for_status()
+        terms = response.json()
+        concepts = []
+        for term in terms:
+            # add score:
+            for concept in term.get("concepts", []):
+                concept["score"] = term.get("score", None)
+            concepts.extend(term.get("concepts", []))
+        return tuple(concepts)
 
     def search_term(self, query_string: str, limit: int = 25) -> DataFrame:
         """
@@ -67,25 +101,13 @@ class HecateConceptSearcher(AbstractConceptSearcher):
 
         """
 
-        params = {"q": query_string, "limit": limit}
-        params.update(self.default_params)
-
         try:
-            response = requests.get(_HECATE_URL, params=params, timeout=15)
-            response.raise_for_status()
-            terms = response.json()
-            concepts = []
-            for term in terms:
-                # add score:
-                for concept in term.get("concepts", []):
-                    concept["score"] = term.get("score", None)
-                concepts.extend(term.get("concepts", []))
-            return pd.DataFrame(concepts)
+            return pd.DataFrame(list(self._fetch_concepts(query_string, limit)))
 
         except requests.exceptions.HTTPError as http_err:
             print(f"HTTP error occurred: {http_err}")
-            print(f"Response status code: {response.status_code}")
-            print(f"Response content: {response.text}")
+            print(f"Response status code: {http_err.response.status_code}")
+            print(f"Response content: {http_err.response.text}")
         except requests.exceptions.ConnectionError as conn_err:
             print(f"Connection error occurred: {conn_err}")
         except requests.exceptions.Timeout as timeout_err:
@@ -123,34 +145,26 @@ class HecateConceptSearcher(AbstractConceptSearcher):
 
         """
 
-        all_results = []
-        for index, row in df.iterrows():
-            term = row[term_column]
+        # Requests are network-bound, so send multiple requests concurrently:
+        unique_terms = list(dict.fromkeys(df[term_column]))
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            term_results = dict(zip(unique_terms, executor.map(lambda t: self.search_term(t, limit), unique_terms)))
+
+        term_matches = []
+        counts = []
+        for term in df[term_column]:
             print(f"Processing term '{term}'")
-            results = self.search_term(term, limit=limit)
-            if results is not None:
-                rows = []
-                for rank, (_, concept) in enumerate(results.iterrows(), start=1):
-                    rows.append(
-                        {
-                            matched_concept_id_column: concept["concept_id"],
-                            matched_concept_name_column: concept["concept_name"],
-                            match_score_column: concept["score"],
-                            match_rank_column: rank,
-                        }
-                    )
-                results = pd.DataFrame(rows)
-                results[match_rank_column] = range(1, len(results) + 1)
-                orig_cols = list(df.columns)
-                new_columns = list(results.columns)
-                results[term_column] = term
-                for col in df.columns:
-                    results[col] = row[col]
-                results = results[orig_cols + new_columns]
-                all_results.append(results)
-
-        all_results = pd.concat(all_results)
-        return all_results
+            results = term_results[term]
+            if results is None or results.empty:
+                counts.append(0)
+                continue
+            term_matches.append(results[["concept_id", "concept_name", "score"]])
+            counts.append(len(results))
+        if not term_matches:
+            return pd.DataFrame()
+        matches = pd.concat(term_matches, ignore_index=True)
+        matches.columns = [matched_concept_id_column, matched_concept_name_column, match_score_column]
+        return self._combine_matches(df, matches, counts, match_rank_column)
 
 
 if __name__ == "__main__":
@@ -14,22 +14,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import itertools
 import os
-import pickle
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 
 import numpy as np
 import pandas as pd
 import psycopg
 from pgvector.psycopg import register_vector
-from dotenv import load_dotenv
 
+from ariadne.utils.config import Config
+from ariadne.utils.embedding_cache import EmbeddingCache
 from ariadne.utils.utils import get_environment_variable
 from ariadne.utils.gen_ai_api import get_embedding_vectors
 from ariadne.vector_search.abstract_concept_searcher import AbstractConceptSearcher
 
-
-load_dotenv()
+_MAX_CACHED_RESULTS = 10_000
 
 
 class PgvectorConceptSearcher(AbstractConceptSearcher):
@@ -38,11 +43,36 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
     A concept searcher that uses pgvector in a PostgreSQL database to find concepts based on embedding vectors.
     """
 
-    def __init__(self, for_evaluation: bool = False, include_synonyms: bool = True, include_mapped_terms: bool = True):
+    def __init__(
+        self,
+        for_evaluation: bool = False,
+        include_synonyms: bool = True,
+        include_mapped_terms: bool = True,
+        config: Optional[Config] = None,
+        ef_search: int = 1000,
+    ):
+        """
+        Initializes the PgvectorConceptSearcher, connecting to the database.
+
+        Args:
+            for_evaluation: If True, excludes the concept classes and source vocabularies not used in the evaluation.
+            include_synonyms: If True, also matches against concept synonyms, not only concept names.
+            include_mapped_terms: If True, also matches against non-standard concepts mapped to standard concepts.
+            config: The config specifying the maximum number of concurrent queries (system.max_cores), and the
+                embedding cache file (system.embedding_cache_file). If None, the default config is loaded.
+            ef_search: The size of the candidate list when searching the HNSW index (hnsw.ef_search). Lower values
+                are faster, at the cost of recall. The maximum is 1000.
+        """
+        if config is None:
+            config = Config()
         self.for_evaluation = for_evaluation
+        self.max_concurrent_queries = config.system.max_cores
         self.include_synonyms = include_synonyms
         self.include_mapped_terms = include_mapped_terms
+        self.ef_search = int(ef_search)
         self.cost = 0.0
+        cache_file = config.system.embedding_cache_file
+        self._embedding_cache = EmbeddingCache(cache_file) if cache_file is not None else None
 
         if for_evaluation:
             self.concept_classes_to_ignore = [
@@ -68,23 +98,42 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
         else:
             self.concept_classes_to_ignore = None
             self.vocabularies_to_ignore = None
-
+        self._query = self._build_query()
+
+        self.connection = self._connect()
+        # A connection runs one query at a time, so concurrent queries each take a connection from this pool. More
+        # connections are opened as needed, up to the number of concurrent queries:
+        self._connections = [self.connection]
+        self._connections_lock = threading.Lock()
+        self._idle_connections = queue.SimpleQueue()
+        self._idle_connections.put(self.connection)
+        # Source terms are often repeated across calls, so keep the results of the most recent queries. The query is
+        # fixed per instance, so results only depend on the vector and the limit:
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+
+    def _connect(self) -> psycopg.Connection:
         connection = psycopg.connect(os.getenv("vocab_connection_string").replace("+psycopg", ""))
         register_vector(connection)
         with connection.cursor() as cur:
-            cur.execute("SET hnsw.ef_search = 1000")
+            cur.execute(f"SET hnsw.ef_search = {self.ef_search}")
             cur.execute("SET hnsw.iterative_scan = relaxed_order")
-        self.connection = connection
+        return connection
 
-    def close(self):
-        self.connection.close()
+    def _acquire_connection(self) -> psycopg.Connection:
+        try:
+            return self._idle_connections.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+            with self._connections_lock:
+                self._connections.append(connection)
+            return connection
 
-    def _search_pgvector(self, source_vector: np.ndarray, limit: int) -> List:
-        if self.concept_classes_to_ignore is None:
-            ignore_string_class = "'dummy'"
-        else:
-            ignore_string_class = ", ".join(f"'{y}'" for y in self.concept_classes_to_ignore)
+    def close(self):
+        for connection in self._connections:
+            connection.close()
 
+    def _build_query(self) -> str:
         if self.include_synonyms:
             term_type_clause = ""
         else:
@@ -94,10 +143,6 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
         vector_table = get_environment_variable("VOCAB_VECTOR_TABLE")
 
         if self.include_mapped_terms:
-            if self.vocabularies_to_ignore is None:
-                ignore_string_vocab = "'dummy'"
-            else:
-                ignore_string_vocab = ", ".join(f"'{x}'" for x in self.vocabularies_to_ignore)
             query = f"""
                 WITH target_concept AS (
                     SELECT concept_id,
@@ -107,7 +152,7 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
                         (
                             SELECT concept.concept_id,
                                 concept.concept_name,
-                                embedding_vector <=> %s AS relevance_score
+                                embedding_vector <=> %(vector)b AS relevance_score
                             FROM {vocabulary_schema}.{vector_table} vectors
                             INNER JOIN {vocabulary_schema}.concept source_concept
                                 ON vectors.concept_id = source_concept.concept_id
@@ -116,11 +161,11 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
                             INNER JOIN {vocabulary_schema}.concept
                                 ON concept_relationship.concept_id_2 = concept.concept_id
                             WHERE relationship_id = 'Maps to'
-                                AND source_concept.vocabulary_id NOT IN ({ignore_string_vocab})
-                                AND concept.concept_class_id NOT IN ({ignore_string_class})
+                                AND source_concept.vocabulary_id <> ALL(%(vocabularies_to_ignore)s)
+                                AND concept.concept_class_id <> ALL(%(concept_classes_to_ignore)s)
                                 {term_type_clause}
-                            ORDER BY embedding_vector <=> %s
-                            LIMIT {limit * 4} -- May have duplicates due to synonyms
+                            ORDER BY embedding_vector <=> %(vector)b
+                            LIMIT %(candidate_limit)s -- May have duplicates due to synonyms
                         )
 
                         UNION ALL
@@ -128,15 +173,15 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
                         (
                             SELECT concept.concept_id,
                                 concept.concept_name,
-                                embedding_vector <=> %s AS relevance_score
+                                embedding_vector <=> %(vector)b AS relevance_score
                             FROM {vocabulary_schema}.{vector_table} vectors
                             INNER JOIN {vocabulary_schema}.concept
                                 ON vectors.concept_id = concept.concept_id
                             WHERE standard_concept = 'S'
-                                AND concept.concept_class_id NOT IN ({ignore_string_class})
+                                AND concept.concept_class_id <> ALL(%(concept_classes_to_ignore)s)
                                 {term_type_clause}
-                            ORDER BY embedding_vector <=> %s
-                            LIMIT {limit * 4} -- May have duplicates due to synonyms
+                            ORDER BY embedding_vector <=> %(vector)b
+                            LIMIT %(candidate_limit)s -- May have duplicates due to synonyms
                         )
                     ) tmp
                     GROUP BY concept_id,
@@ -147,11 +192,8 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
                     target_concept.relevance_score
                 FROM target_concept
                 ORDER BY relevance_score
-                LIMIT {limit};
+                LIMIT %(limit)s;
             """
-            with self.connection.cursor() as cur:
-                cur.execute(query, (source_vector, source_vector, source_vector, source_vector))
-                results = cur.fetchall()
         else:
             query = f"""
                 WITH target_concept AS (
@@ -161,15 +203,15 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
                     FROM (
                         SELECT concept.concept_id,
                             concept.concept_name,
-                            embedding_vector <=> %s AS relevance_score
+                            embedding_vector <=> %(vector)b AS relevance_score
                         FROM {vocabulary_schema}.{vector_table} vectors
                         INNER JOIN {vocabulary_schema}.concept
                             ON vectors.concept_id = concept.concept_id
                         WHERE standard_concept = 'S'
-                            AND concept.concept_class_id NOT IN ({ignore_string_class})
+                            AND concept.concept_class_id <> ALL(%(concept_classes_to_ignore)s)
                             {term_type_clause}
-                        ORDER BY embedding_vector <=> %s
-                        LIMIT {limit * 4} -- May have duplicates due to synonyms
+                        ORDER BY embedding_vector <=> %(vector)b
+                        LIMIT %(candidate_limit)s -- May have duplicates due to synonyms
                     ) tmp
                     GROUP BY concept_id,
                         concept_name
@@ -179,14 +221,58 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
                     target_concept.relevance_score
                 FROM target_concept
                 ORDER BY relevance_score
-                LIMIT {limit};
+                LIMIT %(limit)s;
             """
-            with self.connection.cursor() as cur:
-                cur.execute(query, (source_vector, source_vector))
-                results = cur.fetchall()
+        return query
 
+    def _search_pgvector(self, source_vector: np.ndarray, limit: int) -> List:
+        # The vector is sent in pgvector's binary format (%(vector)b in the query), which for a contiguous float32
+        # array needs no conversion, and avoids formatting and parsing each value as text:
+        source_vector = np.ascontiguousarray(source_vector, dtype=np.float32)
+        key = (hashlib.blake2b(source_vector.tobytes(), digest_size=16).digest(), limit)
+        with self._result_cache_lock:
+            results = self._result_cache.get(key)
+            if results is not None:
+                self._result_cache.move_to_end(key)
+                return results
+        params = {
+            "vector": source_vector,
+            "limit": limit,
+            "candidate_limit": limit * 4,
+            "concept_classes_to_ignore": self.concept_classes_to_ignore or [],
+            "vocabularies_to_ignore": self.vocabularies_to_ignore or [],
+        }
+        connection = self._acquire_connection()
+        try:
+            # Receive the results in binary format too, so IDs and scores are not parsed from text:
+            with connection.cursor(binary=True) as cur:
+                # The query only differs in its parameters, so let the server plan it once per connection:
+                cur.execute(self._query, params, prepare=True)
+                results = cur.fetchall()
+        finally:
+            self._idle_connections.put(connection)
+        with self._result_cache_lock:
+            self._result_cache[key] = results
+            if len(self._result_cache) > _MAX_CACHED_RESULTS:
+                self._result_cache.popitem(last=False)
         return results
 
+    def _get_embeddings(self, terms: List[str]) -> np.ndarray:
+        # Terms are expected to be distinct. Only embed the terms that are not in the cache:
+        if self._embedding_cache is None:
+            cached = [None] * len(terms)
+        else:
+            cached = self._embedding_cache.get(terms)
+        missing = [term for term, vector in zip(terms, cached) if vector is None]
+        if missing:
+            vectors_with_usage = get_embedding_vectors(missing)
+            self.cost = self.cost + vectors_with_usage["usage"]["total_cost_usd"]
+            new_vectors = iter(vectors_with_usage["embeddings"])
+            cached = [next(new_vectors) if vector is None else vector for vector in cached]
+            if self._embedding_cache is not None:
+                self._embedding_cache.set(missing, vectors_with_usage["embeddings"])
+        return np.vstack(cached)
+
     def search_term(self, term: str, limit: int = 25) -> Optional[pd.DataFrame]:
         """
         Searches for concepts matching the given term.
@@ -198,9 +284,7 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
         Returns:
             A DataFrame containing the matching concepts, or None if no matches are found.
         """
-        vectors_with_usage = get_embedding_vectors([term])
-        self.cost = self.cost + vectors_with_usage["usage"]["total_cost_usd"]
-        vector = vectors_with_usage["embeddings"][0]
+        vector = self._get_embeddings([term])[0]
         results = self._search_pgvector(vector, limit)
         if not results:
             return None
@@ -242,36 +326,24 @@ class PgvectorConceptSearcher(AbstractConceptSearcher):
 
         """
 
-        vectors_with_usage = get_embedding_vectors(df[term_column].tolist())
-        self.cost = self.cost + vectors_with_usage["usage"]["total_cost_usd"]
-        vectors = vectors_with_usage["embeddings"]
-
-        df = df.reset_index(drop=True)
-        all_results = []
-        for index, row in df.iterrows():
-            term = row[term_column]
-            # print(f"Processing term '{term}'")
-            vector = vectors[index]
-            results = self._search_pgvector(vector, limit=limit)
-            results = pd.DataFrame(
-                results,
-                columns=[
-                    matched_concept_id_column,
-                    matched_concept_name_column,
-                    match_score_column,
-                ],
-            )
-            results[match_rank_column] = range(1, len(results) + 1)
-            orig_cols = list(df.columns)
-            new_columns = list(results.columns)
-            results[term_column] = term
-            for col in df.columns:
-                results[col] = row[col]
-            results = results[orig_cols + new_columns]
-            all_results.append(results)
-
-        all_results = pd.concat(all_results)
-        return all_results
+        # Embed and search each distinct term only once:
+        term_indices, unique_terms = pd.factorize(df[term_column], use_na_sentinel=False)
+        vectors = self._get_embeddings(unique_terms.tolist())
+
+        # Each query waits on the database, so run several concurrently, each on its own connection:
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_queries) as executor:
+            unique_results = list(executor.map(lambda vector: self._search_pgvector(vector, limit=limit), vectors))
+        all_results = [unique_results[i] for i in term_indices]
+        # Build a single DataFrame from the rows of all queries, instead of one per term:
+        matches = pd.DataFrame(
+            list(itertools.chain.from_iterable(all_results)),
+            columns=[
+                matched_concept_id_column,
+                matched_concept_name_column,
+                match_score_column,
+            ],
+        )
+        return self._combine_matches(df, matches, [len(results) for results in all_results], match_rank_column)
 
     def get_total_cost(self) -> float:
         """
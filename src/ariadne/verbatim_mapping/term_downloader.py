@@ -15,9 +15,10 @@
 # limitations under the License.
 
 
+import itertools
 import logging
 import os
-from typing import List
+from typing import Optional, Sequence
 
 from dotenv import load_dotenv
 from sqlalchemy import (
@@ -102,59 +103,63 @@ def _create_query(engine: Engine, config: Config) -> Select:
     return final_query
 
 
+_TERMS_SCHEMA = pa.schema(
+    [
+        ("concept_id", pa.int64()),
+        ("term", pa.string()),
+        ("concept_name", pa.string()),
+        # ("vocabulary_id", pa.string()),
+        # ("domain_id", pa.string()),
+        # ("standard_concept", pa.string()),
+        # ("source", pa.string()),
+    ]
+)
+
+
 def _store_in_parquet(
-    concept_ids: List[int],
-    terms: List[str],
-    concept_names: List[str],
+    concept_ids: Sequence[int],
+    terms: Sequence[str],
+    concept_names: Sequence[str],
     # vocabulary_ids: List[str],
     # domain_ids: List[str],
     # standard_concepts: List[str],
     # sources: List[str],
-    file_name: str,
+    writer: pq.ParquetWriter,
 ) -> None:
-    concept_id_array = pa.array(concept_ids)
-    term_array = pa.array(terms)
-    concept_name_array = pa.array(concept_names)
-    # vocabulary_id_array = pa.array(vocabulary_ids)
-    # domain_id_array = pa.array(domain_ids)
-    # standard_concept_array = pa.array(standard_concepts)
-    # source_array = pa.array(sources)
-    table = pa.Table.from_arrays(
+    batch = pa.RecordBatch.from_arrays(
         arrays=[
-            concept_id_array,
-            term_array,
-            concept_name_array,
-            # vocabulary_id_array,
-            # domain_id_array,
-            # standard_concept_array,
-            # source_array,
-        ],
-        names=[
-            "concept_id",
-            "term",
-            "concept_name",
-            # "vocabulary_id",
-            # "domain_id",
-            # "standard_concept",
-            # "source",
+            pa.array(concept_ids, type=pa.int64()),
+            pa.array(terms, type=pa.string()),
+            pa.array(concept_names, type=pa.string()),
+            # pa.array(vocabulary_ids, type=pa.string()),
+            # pa.array(domain_ids, type=pa.string()),
+            # pa.array(standard_concepts, type=pa.string()),
+            # pa.array(sources, type=pa.string()),
         ],
+        schema=_TERMS_SCHEMA,
     )
-    pq.write_table(table, file_name)
+    # Each batch becomes a row group in the same file:
+    writer.write_batch(batch)
 
 
-def download_terms(config: Config = Config()) -> None:
+def download_terms(config: Optional[Config] = None) -> None:
     """
-    Download terms from vocabulary database and store them in parquet files for use in verbatim mapping.
+    Download terms from vocabulary database and store them in a parquet file for use in verbatim mapping. Terms are
+    streamed in batches, each stored as a row group of the file.
 
     Args:
         config: A Config object containing configuration parameters. This function uses the verbatim_mapping section of
-            the config, which specifies the vocabularies, domains, etc. to filter the terms to be downloaded.
+            the config, which specifies the vocabularies, domains, etc. to filter the terms to be downloaded. If
+            None, the default config is loaded.
 
     Returns:
         None
     """
+    if config is None:
+        config = Config()
     # Check if Parquet files already exist. Skip download if they do.
-    if os.path.exists(config.system.terms_folder) and os.listdir(config.system.terms_folder):
+    terms_folder = config.system.terms_folder
+    if os.path.exists(terms_folder) and any(f.endswith(".parquet") for f in os.listdir(terms_folder)):
         print(f"Parquet files already exist in folder {config.system.terms_folder}. Skipping download.")
         return
 
@@ -166,29 +171,42 @@ def download_terms(config: Config = Config()) -> None:
 
     engine = create_engine(get_environment_variable("VOCAB_CONNECTION_STRING"))
     query = _create_query(engine=engine, config=config)
+    # Export the terms with COPY, which streams rows in binary without the per-row overhead of a regular query. Binary
+    # COPY needs to know the column types in advance, so cast the columns to fixed types. The filter values are passed
+    # as parameters, with IN lists expanded into one parameter per value:
+    compiled_query = query.compile(engine, compile_kwargs={"render_postcompile": True})
+    copy_statement = (
+        "COPY (SELECT concept_id::BIGINT, term::TEXT, concept_name::TEXT "
+        f"FROM ({compiled_query}) terms) TO STDOUT (FORMAT BINARY)"
+    )
 
-    with engine.connect() as connection:
-        terms_result_set = connection.execution_options(stream_results=True).execute(query)
+    # Write to a temporary file first, so an interrupted download does not leave a partial file that would be used:
+    file_name = os.path.join(config.system.terms_folder, "Terms.parquet")
+    partial_file_name = f"{file_name}.partial"
+    with (
+        engine.connect() as connection,
+        connection.connection.driver_connection.cursor() as cursor,
+        cursor.copy(copy_statement, compiled_query.params) as copy,
+        pq.ParquetWriter(partial_file_name, _TERMS_SCHEMA, compression="zstd") as writer,
+    ):
+        copy.set_types(["int8", "text", "text"])
+        rows = copy.rows()
         total_inserted = 0
         while True:
-            chunk = terms_result_set.fetchmany(config.system.download_batch_size)
+            chunk = list(itertools.islice(rows, config.system.download_batch_size))
             if not chunk:
                 break
+            # Transpose the rows into columns in a single pass. Rows have the column order of the query:
+            concept_ids, terms, concept_names = zip(*chunk)
             _store_in_parquet(
-                concept_ids=[row.concept_id for row in chunk],
-                terms=[row.term for row in chunk],
-                concept_names=[row.concept_name for row in chunk],
-                # vocabulary_ids=[row.vocabulary_id for row in chunk],
-                # domain_ids=[row.domain_id for row in chunk],
-                # standard_concepts=[row.standard_concept for row in chunk],
-                # sources=[row.source for row in chunk],
-                file_name=os.path.join(
-                    config.system.terms_folder,
-                    f"Terms_{total_inserted + 1}_{total_inserted + len(chunk)}.parquet",
-                ),
+                concept_ids=concept_ids,
+                terms=terms,
+                concept_names=concept_names,
+                writer=writer,
             )
             total_inserted += len(chunk)
             logging.info(f"Downloaded {len(chunk)} rows, total downloaded: {total_inserted}")
+    os.replace(partial_file_name, file_name)
     logging.info("Finished downloading terms")
 
 
@@ -14,27 +14,68 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import re
+from typing import Dict, List, Optional
 
 import spacy
 
 from ariadne.utils.config import Config
 
 
+_POSSESSIVE_PATTERN = re.compile(r"(\w)'s\b")
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+# For ASCII strings, replacing the characters matched by the punctuation pattern is several times faster using
+# bytes.translate (str.translate with a mapping is slower than the regex):
+_ASCII_PUNCTUATION_TABLE = bytes(ord(" ") if _PUNCTUATION_PATTERN.match(chr(i)) else i for i in range(256))
+
+
 class TermNormalizer:
     """
     Normalizes clinical term strings for high-precision matching.
     """
 
-    def __init__(self, config: Config = Config()):
+    def __init__(self, config: Optional[Config] = None):
+        if config is None:
+            config = Config()
         self.config = config
+        # Remove all substrings in a single pass, preferring the longest when several match at the same position:
+        substrings = sorted(config.verbatim_mapping.substrings_to_remove, key=len, reverse=True)
+        self._substrings_pattern = re.compile("|".join(map(re.escape, substrings))) if substrings else None
+        if config.verbatim_mapping.lemmatizer_mode == "lookup":
+            self.nlp = self._load_lookup_pipeline()
+        else:
+            self.nlp = self._load_model_pipeline()
+        # Mappers normalize the same terms over and over, so remember the most recent results (in this process only):
+        self.normalize_term = functools.lru_cache(maxsize=200_000)(self.normalize_term)
+
+    @staticmethod
+    def _load_model_pipeline() -> spacy.Language:
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            # Only the lemmas are used, which need the tagger (and its tok2vec), attribute_ruler, and lemmatizer. Skip
+            # loading the parser and named entity recognizer, which take most of the processing time:
+            nlp = spacy.load("en_core_web_sm", exclude=["parser", "senter", "ner"])
             print("spaCy model 'en_core_web_sm' loaded successfully.")
         except IOError:
             print("spaCy model 'en_core_web_sm' not found.")
             print("Please run: python -m spacy download en_core_web_sm")
             raise
+        return nlp
+
+    @staticmethod
+    def _load_lookup_pipeline() -> spacy.Language:
+        # A blank pipeline with a lookup lemmatizer has no neural network, so it is much faster than en_core_web_sm,
+        # but it lemmatizes words without knowing their part of speech:
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lemmatizer", config={"mode": "lookup"})
+        try:
+            nlp.initialize()
+            print("spaCy lookup lemmatizer loaded successfully.")
+        except ValueError:
+            print("spaCy lookup tables not found.")
+            print("Please run: pip install spacy-lookups-data")
+            raise
+        return nlp
 
     def normalize_term(self, term: str) -> str:
         """
@@ -58,6 +99,43 @@ class TermNormalizer:
         Returns:
             The normalized term string.
         """
+        # 1-4. Clean the term string
+        term = self._clean_term(term)
+        if not term.strip():
+            return ""
+
+        # 5. Tokenize and lemmatize using spaCy
+        doc = self.nlp(term)
+
+        # 6-7. Remove empty tokens and join the tokens into a single string
+        return self._join_lemmas(doc)
+
+    def normalize_terms(
+        self, terms: List[str], batch_size: int = 1000, cache: Optional[Dict[str, str]] = None
+    ) -> List[str]:
+        """
+        Normalizes multiple clinical term strings, as normalize_term does. Terms that are identical after cleanup are
+        lemmatized only once, and are lemmatized as a stream using spaCy's nlp.pipe, which is much faster than
+        processing each term separately.
+
+        Args:
+            terms: The clinical term strings to normalize.
+            batch_size: The number of terms spaCy processes per batch.
+            cache: (Optional) A dictionary from cleaned to normalized terms, used to reuse lemmatizations across calls.
+                It is updated with the newly lemmatized terms.
+
+        Returns:
+            The normalized term strings, in the same order as the input terms.
+        """
+        if cache is None:
+            cache = {}
+        cleaned_terms = [self._clean_term(term) for term in terms]
+        new_terms = [term for term in dict.fromkeys(cleaned_terms) if term not in cache]
+        for term, doc in zip(new_terms, self.nlp.pipe(new_terms, batch_size=batch_size)):
+            cache[term] = self._join_lemmas(doc)
+        return [cache[term] for term in cleaned_terms]
+
+    def _clean_term(self, term: str) -> str:
         # 1. Convert to lowercase
         term = term.lower()
 
@@ -65,19 +143,22 @@ class TermNormalizer:
         # This handles "Alzheimer's disease" -> "Alzheimer disease"
         # It finds a word character (\w) followed by 's and a word boundary (\b),
         # and replaces the whole thing with just the captured word character (group 1).
-        term = re.sub(r"(\w)'s\b", r"\1", term)
+        term = _POSSESSIVE_PATTERN.sub(r"\1", term)
 
         # 3. Remove specific non-informative substrings
-        for sub in self.config.verbatim_mapping.substrings_to_remove:
-            term = term.replace(sub, ' ')
+        if self._substrings_pattern is not None:
+            term = self._substrings_pattern.sub(" ", term)
 
         # 4. Remove all punctuation (replace with a space)
         # This handles "liver-disorder" and "liver, disorder"
-        term = re.sub(r'[^\w\s]', ' ', term)
-
-        # 5. Tokenize and lemmatize using spaCy
-        doc = self.nlp(term)
-
+        if term.isascii():
+            term = term.encode("ascii").translate(_ASCII_PUNCTUATION_TABLE).decode("ascii")
+        else:
+            term = _PUNCTUATION_PATTERN.sub(" ", term)
+        return term
+
+    @staticmethod
+    def _join_lemmas(doc) -> str:
         processed_tokens = []
         for token in doc:
             # Get the lemma (base form)
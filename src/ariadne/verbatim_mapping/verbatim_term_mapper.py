@@ -15,9 +15,7 @@
 # limitations under the License.
 
 
-import pandas as pd
-
-from typing import List, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from ariadne.utils.config import Config
 from ariadne.verbatim_mapping.term_normalizer import TermNormalizer
@@ -28,42 +26,74 @@ class VerbatimTermMapper:
     Maps a source term to a provided subset of target concepts based on exact matches of normalized terms.
     """
 
-    def __init__(self, config: Config = Config()):
+    def __init__(self, config: Optional[Config] = None):
+        if config is None:
+            config = Config()
         self.term_normalizer = TermNormalizer(config)
 
-    def map_term(
+    def build_index(
         self,
-        source_term: str,
         target_concept_ids: List[int],
         target_terms: List[str],
-        target_synonyms: List[str],
-    ) -> (Union[int, None], Union[str, None]):
+        target_synonyms: List[Union[str, List[str], None]],
+    ) -> Dict[str, Tuple[int, str]]:
         """
-        Maps a source term to the best matching target concept ID based on normalized terms.
+        Builds an index of normalized target terms and synonyms, for use in map_term. Building the index once and
+        reusing it avoids normalizing all target terms for every source term.
 
         Args:
-            source_term: the source clinical term to map
             target_concept_ids: a list of target concept IDs
             target_terms: a list of target clinical terms
-            target_synonyms: a list of target synonyms. Each string is semicolon separated synonyms for the
-                corresponding target term.
+            target_synonyms: a list of target synonyms. Each entry is either a string of semicolon separated synonyms
+                or a list of synonyms for the corresponding target term, or missing (None or NaN) if there are none.
+
+        Returns:
+            A dictionary from normalized term to a tuple of (concept_id, term). If a normalized term matches multiple
+            targets, the first target is used.
+        """
+        concepts = []
+        terms = []
+        for concept_id, term, synonyms in zip(target_concept_ids, target_terms, target_synonyms):
+            concepts.append((concept_id, term))
+            terms.append(term)
+            # A plain type check is much cheaper than pd.isna, and treats None and NaN alike as missing:
+            if isinstance(synonyms, str):
+                synonyms = synonyms.split(";")
+            elif not isinstance(synonyms, list):
+                continue
+            for synonym in synonyms:
+                concepts.append((concept_id, term))
+                terms.append(synonym)
+        index = {}
+        for normalized_term, concept in zip(self.term_normalizer.normalize_terms(terms), concepts):
+            index.setdefault(normalized_term, concept)
+        return index
+
+    def map_term(
+        self,
+        source_term: str,
+        target_concept_ids: Optional[List[int]] = None,
+        target_terms: Optional[List[str]] = None,
+        target_synonyms: Optional[List[Union[str, List[str], None]]] = None,
+        index: Optional[Dict[str, Tuple[int, str]]] = None,
+    ) -> (Union[int, None], Union[str, None]):
+        """
+        Maps a source term to the best matching target concept ID based on normalized terms. The targets can be
+        provided either as an index created using build_index, or as lists of target concept IDs, terms, and synonyms.
+
+        Args:
+            source_term: the source clinical term to map
+            target_concept_ids: a list of target concept IDs. Ignored if index is provided.
+            target_terms: a list of target clinical terms. Ignored if index is provided.
+            target_synonyms: a list of target synonyms, as in build_index. Ignored if index is provided.
+            index: (Optional) An index of the target terms created using build_index.
 
         Returns:
             A tuple of (mapped_concept_id, mapped_term) if a match is found, otherwise (None, None)
         """
-        normalized_source = self.term_normalizer.normalize_term(source_term)
-        for concept_id, term, synonyms in zip(
-            target_concept_ids, target_terms, target_synonyms
-        ):
-            normalized_term = self.term_normalizer.normalize_term(term)
-            if normalized_source == normalized_term:
-                return concept_id, term
-            if not pd.isna(synonyms):
-                for synonym in synonyms.split(";"):
-                    normalized_synonym = self.term_normalizer.normalize_term(synonym)
-                    if normalized_source == normalized_synonym:
-                        return concept_id, term
-        return None, None
+        if index is None:
+            index = self.build_index(target_concept_ids, target_terms, target_synonyms)
+        return index.get(self.term_normalizer.normalize_term(source_term), (None, None))
 
 
 if __name__ == "__main__":
@@ -15,11 +15,12 @@
 # limitations under the License.
 
 
-import multiprocessing
 import os
 import pickle
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from typing import Set, List, Optional
 
 from ariadne.utils.config import Config
@@ -36,7 +37,9 @@ class VocabVerbatimTermMapper:
     2. If not, the index is created by processing all Parquet files in the terms folder specified in the config.
     """
 
-    def __init__(self, config: Config = Config()):
+    def __init__(self, config: Optional[Config] = None):
+        if config is None:
+            config = Config()
         self.term_normalizer = TermNormalizer(config)
         if os.path.exists(config.system.verbatim_mapping_index_file):
             with open(config.system.verbatim_mapping_index_file, "rb") as handle:
@@ -56,28 +59,39 @@ class VocabVerbatimTermMapper:
             for f in os.listdir(config.system.terms_folder)
             if f.endswith(".parquet")
         ]
-        pool = multiprocessing.get_context("spawn").Pool(processes=config.system.max_cores)
         index_data = {}
+        # Many terms are identical after cleanup, so reuse their lemmas across batches and files:
+        normalization_cache = {}
+        # A concept appears once for its name and once for each synonym, so share a single (concept_id, concept_name)
+        # tuple between all its index entries. Pickle preserves the sharing, so this also shrinks the loaded index:
+        shared_concepts = {}
         for file in all_files:
             print(f"Processing file: {file}")
-            df = pd.read_parquet(file)
-            normalized_terms = pool.map(self.term_normalizer.normalize_term, df["term"].tolist())
-            for norm_term, concept_id, concept_name in zip(
-                normalized_terms, df["concept_id"].tolist(), df["concept_name"].tolist()
+            # Process the file in batches, so only one batch of terms is in memory at a time, and only read the columns
+            # that are used:
+            for batch in pq.ParquetFile(file).iter_batches(
+                batch_size=config.system.download_batch_size, columns=["term", "concept_id", "concept_name"]
             ):
-                concept = (int(concept_id), concept_name)
-                if norm_term in index_data:
-                    existing = index_data[norm_term]
-                    if isinstance(existing, list):
-                        if concept_id not in [c[0] for c in existing]:
-                            existing.append(concept)
+                normalized_terms = self.term_normalizer.normalize_terms(
+                    batch.column("term").to_pylist(), cache=normalization_cache
+                )
+                for norm_term, concept_id, concept_name in zip(
+                    normalized_terms, batch.column("concept_id").to_pylist(), batch.column("concept_name").to_pylist()
+                ):
+                    # to_pylist already returns Python ints, so concept IDs need no conversion:
+                    concept = (concept_id, concept_name)
+                    concept = shared_concepts.setdefault(concept, concept)
+                    if norm_term in index_data:
+                        existing = index_data[norm_term]
+                        if isinstance(existing, list):
+                            if concept_id not in [c[0] for c in existing]:
+                                existing.append(concept)
+                        else:
+                            if concept_id != existing[0]:
+                                index_data[norm_term] = [existing, concept]
                     else:
-                        if concept_id != existing[0]:
-                            index_data[norm_term] = [existing, concept]
-                else:
-                    index_data[norm_term] = concept
+                        index_data[norm_term] = concept
 
-        pool.close()
         self.index = index_data
 
         try:
@@ -98,8 +112,28 @@ class VocabVerbatimTermMapper:
             A list of concept ID - concept name tuples, possibly empty if no match is found.
         """
         normalized_source = self.term_normalizer.normalize_term(source_term)
-        if normalized_source in self.index:
-            concepts = self.index[normalized_source]
+        return self._lookup(normalized_source)
+
+    def map_term_list(self, source_terms: List[str]) -> List[List[tuple[int, str]]]:
+        """
+        Maps a list of source terms to concept IDs using the pre-built index. Each distinct term is normalized only
+        once.
+
+        Args:
+            source_terms: the source clinical terms to map
+
+        Returns:
+            A list with, for each source term, a list of concept ID - concept name tuples, possibly empty if no match
+            is found.
+        """
+        unique_terms = list(dict.fromkeys(source_terms))
+        normalized_terms = self.term_normalizer.normalize_terms(unique_terms)
+        mapped = {term: self._lookup(normalized) for term, normalized in zip(unique_terms, normalized_terms)}
+        return [mapped[term] for term in source_terms]
+
+    def _lookup(self, normalized_term: str) -> List[tuple[int, str]]:
+        if normalized_term in self.index:
+            concepts = self.index[normalized_term]
             if isinstance(concepts, list):
                 return concepts
             else:
@@ -112,6 +146,7 @@ class VocabVerbatimTermMapper:
         term_column: str = "cleaned_term",
         mapped_concept_id_column: str = "mapped_concept_id",
         mapped_concept_name_column: str = "mapped_concept_name",
+        all_matches: bool = False,
     ) -> pd.DataFrame:
         """
         Maps source terms in a DataFrame column to concept IDs using the pre-built index.
@@ -121,33 +156,26 @@ class VocabVerbatimTermMapper:
             term_column: Name of the column with terms to map
             mapped_concept_id_column: Name of the column to store matched concept IDs.
             mapped_concept_name_column: Name of the column to store matched concept names.
+            all_matches: If False, only the first matching concept of each term is returned. If True, each term that
+                matches multiple concepts is repeated, once for each matching concept.
 
         Returns:
-            A DataFrame with the original columns and their mapped concept IDs and names.
+            A DataFrame with the original columns and their mapped concept IDs and names. Terms without a match have
+            concept ID -1 and an empty concept name.
         """
-        source_terms[[mapped_concept_id_column, mapped_concept_name_column]] = source_terms[term_column].apply(
-            lambda term: pd.Series(self.map_term(term)[0] if self.map_term(term) else (-1, ""))
-        )
+        # Normalize all distinct terms in one batch:
+        matches = [concepts or [(-1, "")] for concepts in self.map_term_list(source_terms[term_column].tolist())]
+        if all_matches:
+            # Repeat each row once per matching concept, keeping the original index, as DataFrame.explode does:
+            counts = [len(concepts) for concepts in matches]
+            source_terms = source_terms.iloc[np.repeat(np.arange(len(source_terms)), counts)].copy()
+            concepts = [concept for concepts in matches for concept in concepts]
+        else:
+            concepts = [concepts[0] for concepts in matches]
+        source_terms[mapped_concept_id_column] = [concept[0] for concept in concepts]
+        source_terms[mapped_concept_name_column] = [concept[1] for concept in concepts]
         return source_terms
 
-        # mapped_data = []
-        # for term in source_terms[term_column]:
-        #     concepts = self.map_term(term)
-        #     if concepts:
-        #         for concept in concepts:
-        #             mapped_data.append({
-        #                 term_column: term,
-        #                 matched_concept_id_column: concept[0],
-        #                 matched_concept_name_column: concept[1]
-        #             })
-        #     else:
-        #         mapped_data.append({
-        #             term_column: term,
-        #             matched_concept_id_column: -1,
-        #             matched_concept_name_column: ""
-        #         })
-        # return pd.DataFrame(mapped_data)
-
 
 if __name__ == "__main__":
     mapper = VocabVerbatimTermMapper()
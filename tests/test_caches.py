@@ -0,0 +1,48 @@
+import numpy as np
+
+from ariadne.utils.embedding_cache import EmbeddingCache
+from ariadne.utils.llm_cache import LlmCache
+
+
+def test_llm_cache_round_trip_and_reopen(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_MODEL", "model-a")
+    filename = tmp_path / "cache" / "llm_cache.sqlite"
+    cache = LlmCache(filename)
+    assert cache.get("system", "prompt") is None
+
+    cache.set("system", "prompt", "response", cost=0.5)
+    cache.set(None, "prompt", "response without system prompt")
+    assert cache.get("system", "prompt") == "response"
+    assert cache.get(None, "prompt") == "response without system prompt"
+
+    reopened = LlmCache(filename)
+    assert reopened.get("system", "prompt") == "response"
+    assert reopened.get("other system", "prompt") is None
+
+    reopened.set("system", "prompt", "new response")
+    assert cache.get("system", "prompt") == "new response"
+
+    # Responses are specific to the model:
+    monkeypatch.setenv("LLM_MODEL", "model-b")
+    assert reopened.get("system", "prompt") is None
+
+
+def test_embedding_cache_round_trip_and_reopen(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_MODEL", "model-a")
+    filename = tmp_path / "embedding_cache.sqlite"
+    cache = EmbeddingCache(filename)
+    assert cache.get([]) == []
+
+    texts = [f"term {i}" for i in range(2500)]
+    vectors = np.random.default_rng(0).random((len(texts), 4))
+    cache.set(texts, vectors)
+
+    reopened = EmbeddingCache(filename)
+    cached = reopened.get(["missing"] + texts)
+    assert cached[0] is None
+    for cached_vector, vector in zip(cached[1:], vectors):
+        assert cached_vector.dtype == np.float32
+        np.testing.assert_array_equal(cached_vector, vector.astype(np.float32))
+
+    monkeypatch.setenv("EMBEDDING_MODEL", "model-b")
+    assert reopened.get(texts[:2]) == [None, None]
@@ -0,0 +1,25 @@
+import json
+
+from ariadne.llm_mapping.llm_mapper import _extract_json_object
+
+
+def test_extract_json_object_from_surrounding_text():
+    text = 'Here is the answer:\n```json\n{"source_term": "a", "target_concepts": []}\n```\nDone.'
+    assert json.loads(_extract_json_object(text)) == {"source_term": "a", "target_concepts": []}
+
+
+def test_extract_json_object_nested():
+    text = 'x {"a": {"b": {"c": 1}}, "d": [{"e": 2}]} {"second": true}'
+    assert _extract_json_object(text) == '{"a": {"b": {"c": 1}}, "d": [{"e": 2}]}'
+
+
+def test_extract_json_object_ignores_braces_in_strings():
+    obj = {"source_term": "brace } and { in a string", "quote": 'escaped \\" quote }', "backslash": "\\"}
+    text = "Response: " + json.dumps(obj) + " trailing }"
+    assert json.loads(_extract_json_object(text)) == obj
+
+
+def test_extract_json_object_malformed():
+    assert _extract_json_object("no json here") is None
+    assert _extract_json_object('{"a": {"b": 1}') is None
+    assert _extract_json_object('{"a": "unterminated }') is None
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ariadne.llm_mapping.semantic_response_cache as semantic_response_cache_module
+from ariadne.llm_mapping.semantic_response_cache import SemanticResponseCache
+from ariadne.utils.config import Config
+
+# "diabetes" and "diabetes type 2" are near-duplicates, "asthma" is not similar to either:
+_VECTORS = {"diabetes": [1.0, 0.0], "diabetes type 2": [1.0, 0.01], "asthma": [0.0, 1.0]}
+
+
+class _FakeLlmMapper:
+    def __init__(self, responses_folder, concept_id):
+        self.responses_folder = str(responses_folder)
+        self.concept_id = concept_id
+        self.mapped_terms = []
+
+    def map_terms(
+        self,
+        source_target_concepts,
+        term_column,
+        source_id_column,
+        source_term_column,
+        concept_id_column,
+        mapped_concept_id_column,
+        mapped_concept_name_column,
+        mapped_rationale_column,
+        **kwargs,
+    ):
+        rows = source_target_concepts.drop_duplicates(subset=term_column)
+        self.mapped_terms.extend(rows[term_column])
+        return pd.DataFrame(
+            {
+                term_column: rows[term_column],
+                source_id_column: rows[source_id_column].astype(str),
+                source_term_column: rows[source_term_column],
+                mapped_concept_id_column: self.concept_id,
+                mapped_concept_name_column: "Concept",
+                mapped_rationale_column: "Rationale",
+            }
+        ).reset_index(drop=True)
+
+    def get_total_cost(self):
+        return 0.0
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    def fake_get_embedding_vectors(texts):
+        return {
+            "embeddings": np.array([_VECTORS[text] for text in texts], dtype=np.float32),
+            "usage": {"total_cost_usd": 0.0},
+        }
+
+    monkeypatch.setattr(semantic_response_cache_module, "get_embedding_vectors", fake_get_embedding_vectors)
+
+
+def _candidates(term, concept_ids):
+    return pd.DataFrame(
+        {
+            "source_concept_id": "1",
+            "source_term": term,
+            "cleaned_term": term,
+            "matched_concept_id": concept_ids,
+        }
+    )
+
+
+def _create_cache(tmp_path, concept_id):
+    llm_mapper = _FakeLlmMapper(tmp_path, concept_id)
+    return SemanticResponseCache(llm_mapper, Config()), llm_mapper
+
+
+def test_reuses_mapping_if_concept_is_a_candidate(tmp_path):
+    cache, llm_mapper = _create_cache(tmp_path, concept_id=10)
+    cache.map_terms(_candidates("diabetes", [10, 20]))
+
+    result = cache.map_terms(_candidates("diabetes type 2", [10, 30]))
+    assert llm_mapper.mapped_terms == ["diabetes"]
+    assert result["mapped_concept_id"].tolist() == [10]
+
+    # Not reused if the mapped concept is not among the candidates of the new term:
+    cache.map_terms(_candidates("diabetes type 2", [20, 30]))
+    assert llm_mapper.mapped_terms == ["diabetes", "diabetes type 2"]
+
+
+def test_does_not_reuse_dissimilar_terms(tmp_path):
+    cache, llm_mapper = _create_cache(tmp_path, concept_id=10)
+    cache.map_terms(_candidates("diabetes", [10]))
+    cache.map_terms(_candidates("asthma", [10]))
+    assert llm_mapper.mapped_terms == ["diabetes", "asthma"]
+
+
+def test_reuses_no_match_only_for_covered_candidates(tmp_path):
+    cache, llm_mapper = _create_cache(tmp_path, concept_id=-1)
+    cache.map_terms(_candidates("diabetes", [10, 20]))
+
+    # A candidate the cached term was not shown could be a match, so the LLM is prompted:
+    cache.map_terms(_candidates("diabetes type 2", [10, 30]))
+    assert llm_mapper.mapped_terms == ["diabetes", "diabetes type 2"]
+
+    # The most similar cached term is now "diabetes type 2" itself, which was shown concepts 10 and 30:
+    result = cache.map_terms(_candidates("diabetes type 2", [10]))
+    assert llm_mapper.mapped_terms == ["diabetes", "diabetes type 2"]
+    assert result["mapped_concept_id"].tolist() == [-1]
+
+
+def test_cache_is_persisted(tmp_path):
+    cache, _ = _create_cache(tmp_path, concept_id=10)
+    cache.map_terms(_candidates("diabetes", [10]))
+
+    reloaded_cache, llm_mapper = _create_cache(tmp_path, concept_id=99)
+    result = reloaded_cache.map_terms(_candidates("diabetes type 2", [10]))
+    assert llm_mapper.mapped_terms == []
+    assert result["mapped_concept_id"].tolist() == [10]
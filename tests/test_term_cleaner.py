@@ -0,0 +1,57 @@
+import re
+
+import pytest
+
+import ariadne.term_cleanup.term_cleaner as term_cleaner_module
+from ariadne.term_cleanup.term_cleaner import TermCleaner
+from ariadne.utils.config import Config
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    # Fakes the LLM: batch prompts only get answers for odd term numbers, single prompts are always answered:
+    sent_prompts = []
+
+    def fake_get_llm_response(prompt, system_prompt=None):
+        sent_prompts.append(prompt)
+        if prompt.startswith("#Term:"):
+            content = f"#Term: single {prompt[len('#Term: '):]}"
+        else:
+            terms = re.findall(r"^#Term (\d+): (.+)$", prompt, flags=re.MULTILINE)
+            content = "\n".join(f"#Cleaned {number}: batch {term}" for number, term in terms if int(number) % 2 == 1)
+        return {"content": content, "usage": {"total_cost_usd": 0.01}}
+
+    monkeypatch.setattr(term_cleaner_module, "get_llm_response", fake_get_llm_response)
+    return sent_prompts
+
+
+@pytest.fixture
+def term_cleaner():
+    config = Config()
+    config.system.term_cleaner_cache_file = None
+    return TermCleaner(config)
+
+
+def test_clean_terms_batch_falls_back_on_missing_numbers(prompts, term_cleaner):
+    terms = ["a, unspecified", "b without c", "d, nos", "plain term", "a, unspecified"]
+    cleaned = term_cleaner.clean_terms_batch(terms, batch_size=3)
+
+    assert cleaned == [
+        "batch a, unspecified",
+        "single b without c",
+        "batch d, nos",
+        "plain term",
+        "batch a, unspecified",
+    ]
+    # One batch prompt for the three distinct terms that need cleaning, plus one single prompt for the missing answer:
+    assert len(prompts) == 2
+    assert prompts[1] == "#Term: b without c"
+
+
+def test_clean_terms_batch_falls_back_on_empty_response(monkeypatch, term_cleaner):
+    def fake_get_llm_response(prompt, system_prompt=None):
+        content = None if not prompt.startswith("#Term:") else f"#Term: single {prompt[len('#Term: '):]}"
+        return {"content": content, "usage": {"total_cost_usd": 0.0}}
+
+    monkeypatch.setattr(term_cleaner_module, "get_llm_response", fake_get_llm_response)
+    assert term_cleaner.clean_terms_batch(["x, nos", "y, nos"], batch_size=2) == ["single x, nos", "single y, nos"]